@@ -0,0 +1,112 @@
+from itertools import count
+from typing import Any
+
+from httpx import AsyncClient, MockTransport, Request, Response
+from telegram import Message, Update
+
+import service.temptake.client as temptake_client
+
+
+MANAGER = {"id": 5, "mac": "AA:BB:CC:DD:EE:01", "createdAt": "2025-01-01T00:00:00"}
+WORKERS = [{"id": 100 + index, "mac": f"AA:BB:CC:DD:{index // 256:02X}:{index % 256:02X}"} for index in range(20)]
+GROUP_MANAGERS = [{"id": 10 + index, "mac": f"AA:BB:CC:00:00:{index:02X}"} for index in range(10)]
+USER_GROUPS = [{"id": 1, "name": "Benchmark group"}]
+
+
+# TempTake server stub answering every endpoint the handlers use
+def temptake_handler(request: Request) -> Response:
+    routes = {
+        ("GET", "/api/manager"): MANAGER,
+        ("GET", "/api/manager/workers"): WORKERS,
+        ("GET", "/api/group/managers"): GROUP_MANAGERS,
+        ("GET", "/api/user/groups"): USER_GROUPS,
+        ("GET", "/api/worker"): WORKERS[0],
+        ("POST", "/api/manager/worker"): {"id": 1},
+        ("POST", "/api/group/manager"): {"id": 1},
+    }
+    body = routes.get((request.method, request.url.path))
+    if body is None:
+        return Response(404, text="Not found")
+    return Response(200, json=body)
+
+
+def install_temptake_stub() -> None:
+    temptake_client._client = AsyncClient(base_url="http://temptake", transport=MockTransport(temptake_handler))
+
+
+# Telegram bot stub recording calls instead of sending them
+class FakeBot:
+    def __init__(self):
+        self.calls = 0
+        self._message_ids = count(1000)
+        self.id = 1
+        self.username = "benchmark_bot"
+
+    async def _record(self, **kwargs: Any) -> Message:
+        self.calls += 1
+        return Message.de_json(
+            {
+                "message_id": next(self._message_ids),
+                "date": 0,
+                "chat": {"id": kwargs.get("chat_id", 1), "type": "private"},
+                "text": kwargs.get("text", ""),
+            },
+            None
+        )
+
+    async def send_message(self, **kwargs: Any) -> Message:
+        return await self._record(**kwargs)
+
+    async def edit_message_text(self, **kwargs: Any) -> Message:
+        return await self._record(**kwargs)
+
+    async def edit_message_reply_markup(self, **kwargs: Any) -> Message:
+        return await self._record(**kwargs)
+
+    async def answer_callback_query(self, *args: Any, **kwargs: Any) -> bool:
+        return True
+
+
+class FakeContext:
+    def __init__(self, bot: FakeBot):
+        self.bot = bot
+        self.args = []
+
+
+_update_ids = count(1)
+
+
+def callback_update(bot: FakeBot, data: str, chat_id: int = 1, message_id: int = 1) -> Update:
+    return Update.de_json(
+        {
+            "update_id": next(_update_ids),
+            "callback_query": {
+                "id": "1",
+                "from": {"id": chat_id, "is_bot": False, "first_name": "Bench"},
+                "chat_instance": "1",
+                "data": data,
+                "message": {
+                    "message_id": message_id,
+                    "date": 0,
+                    "chat": {"id": chat_id, "type": "private", "username": "bench"},
+                    "text": "menu",
+                },
+            },
+        },
+        bot
+    )
+
+
+def message_update(bot: FakeBot, text: str, chat_id: int = 1) -> Update:
+    return Update.de_json(
+        {
+            "update_id": next(_update_ids),
+            "message": {
+                "message_id": next(_update_ids),
+                "date": 0,
+                "chat": {"id": chat_id, "type": "private", "username": "bench"},
+                "text": text,
+            },
+        },
+        bot
+    )
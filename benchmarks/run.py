@@ -0,0 +1,187 @@
+# Usage: python -m benchmarks.run [--output FILE] [--compare PREVIOUS_FILE]
+from os import environ
+
+# Must be set before config is imported
+environ.setdefault("INTERNAL_SECRET", "benchmark-secret")
+environ.setdefault("TELEGRAM_BOT_TOKEN", "1:benchmark")
+environ.setdefault("SERVER_HOST", "temptake")
+environ.setdefault("SERVER_PORT", "80")
+
+import argparse
+import asyncio
+import platform
+import subprocess
+from json import dump, load
+from statistics import mean, median, stdev
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from benchmarks.fakes import FakeBot, FakeContext, callback_update, message_update, install_temptake_stub
+from enums.ButtonAction import ButtonAction
+from enums.JsonIdentifier import JsonIdentifier
+from enums.PayloadIdentifier import PayloadIdentifier
+from enums.PendingAction import PendingAction
+from service.telegram.KeyboardBuilder import KeyboardBuilder
+from service.telegram.buttons import add_module_rows, button_handler
+from service.telegram.messages import message_handler
+from service.telegram.state import state_store
+from service.temptake.cache import topology_cache
+from util.payload import create_payload, split_payload
+from util.security import generate_jwt, token_cache
+
+
+def summarize(name: str, timings: list[float], iterations: int) -> dict[str, Any]:
+    per_call = [timing / iterations * 1e6 for timing in timings]
+    return {
+        "name": name,
+        "iterations": iterations,
+        "rounds": len(timings),
+        "min_us": min(per_call),
+        "mean_us": mean(per_call),
+        "median_us": median(per_call),
+        "stdev_us": stdev(per_call) if len(per_call) > 1 else 0.0,
+    }
+
+
+def bench(name: str, function: Callable[[], Any], iterations: int, rounds: int) -> dict[str, Any]:
+    function()
+    timings = []
+    for _ in range(rounds):
+        start = perf_counter()
+        for _ in range(iterations):
+            function()
+        timings.append(perf_counter() - start)
+    return summarize(name, timings, iterations)
+
+
+async def bench_async(name: str, function: Callable[[], Awaitable[Any]], iterations: int, rounds: int) -> dict[str, Any]:
+    await function()
+    timings = []
+    for _ in range(rounds):
+        start = perf_counter()
+        for _ in range(iterations):
+            await function()
+        timings.append(perf_counter() - start)
+    return summarize(name, timings, iterations)
+
+
+def sync_benchmarks(scale: int, rounds: int) -> list[dict[str, Any]]:
+    payload = create_payload(PayloadIdentifier.MANAGER_IDENTIFIER, "12345", ButtonAction.DAY)
+    named_payload = create_payload(PayloadIdentifier.GROUP_IDENTIFIER, "42", "Greenhouse north wing")
+    credentials = {JsonIdentifier.TELEGRAM_ID_KEY.value: "1", JsonIdentifier.TELEGRAM_USERNAME_KEY.value: "bench"}
+    rows = [{"id": index, "mac": f"AA:BB:CC:DD:{index // 256:02X}:{index % 256:02X}"} for index in range(1000)]
+
+    def build_keyboard():
+        keyboard_builder = KeyboardBuilder()
+        for row in range(5):
+            keyboard_builder.add_row()
+            for column in range(3):
+                keyboard_builder.add_row_button(text=f"{row}:{column}", callback_data=payload)
+        return keyboard_builder.build()
+
+    def generate_uncached_jwt():
+        token_cache.clear()
+        return generate_jwt(credentials)
+
+    return [
+        bench("create_payload", lambda: create_payload(PayloadIdentifier.MANAGER_IDENTIFIER, "12345", ButtonAction.DAY), 1000 * scale, rounds),
+        bench("create_payload_named", lambda: create_payload(PayloadIdentifier.GROUP_IDENTIFIER, "42", "Greenhouse north wing"), 1000 * scale, rounds),
+        bench("split_payload", lambda: split_payload(payload), 1000 * scale, rounds),
+        bench("split_payload_named", lambda: split_payload(named_payload), 1000 * scale, rounds),
+        bench("generate_jwt_cached", lambda: generate_jwt(credentials), 1000 * scale, rounds),
+        bench("generate_jwt_uncached", generate_uncached_jwt, 100 * scale, rounds),
+        bench("keyboard_builder_5x3", build_keyboard, 100 * scale, rounds),
+        bench(
+            "add_module_rows_1000",
+            lambda: add_module_rows(rows, PayloadIdentifier.WORKER_IDENTIFIER, JsonIdentifier.MAC_KEY, KeyboardBuilder()).build(),
+            max(1, scale),
+            rounds
+        ),
+    ]
+
+
+async def async_benchmarks(scale: int, rounds: int) -> list[dict[str, Any]]:
+    install_temptake_stub()
+    bot = FakeBot()
+    context = FakeContext(bot)
+    manager_payload = create_payload(PayloadIdentifier.MANAGER_IDENTIFIER, "5", "AA:BB:CC:DD:EE:01")
+    group_payload = create_payload(PayloadIdentifier.GROUP_IDENTIFIER, "1", "Benchmark group")
+    message_ids = iter(range(1, 10 ** 9))
+
+    async def manager_menu_cold():
+        topology_cache.clear()
+        await button_handler(callback_update(bot, manager_payload, message_id=next(message_ids)), context)
+
+    async def manager_menu_warm():
+        await button_handler(callback_update(bot, manager_payload, message_id=next(message_ids)), context)
+
+    async def group_menu_cold():
+        topology_cache.clear()
+        await button_handler(callback_update(bot, group_payload, message_id=next(message_ids)), context)
+
+    async def add_worker_message():
+        await state_store.set(PendingAction.ADD_WORKER, 1, 5)
+        await message_handler(message_update(bot, "aa:bb:cc:dd:ee:ff"), context)
+
+    results = [
+        await bench_async("button_handler_manager_menu_cold", manager_menu_cold, 10 * scale, rounds),
+        await bench_async("button_handler_manager_menu_warm", manager_menu_warm, 10 * scale, rounds),
+        await bench_async("button_handler_group_menu_cold", group_menu_cold, 10 * scale, rounds),
+        await bench_async("message_handler_add_worker", add_worker_message, 10 * scale, rounds),
+    ]
+    return results
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: list[dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path) as baseline_file:
+        baseline = {result["name"]: result for result in load(baseline_file)["benchmarks"]}
+
+    for result in results:
+        previous = baseline.get(result["name"])
+        if previous is None:
+            print(f"{result['name']:<40} {result['median_us']:>12.2f}us  (new)")
+            continue
+        ratio = result["median_us"] / previous["median_us"]
+        print(f"{result['name']:<40} {result['median_us']:>12.2f}us  x{ratio:.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the bot's hot paths")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the JSON results")
+    parser.add_argument("--compare", help="previous results to compare against")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=1, help="multiplies the iterations of every benchmark")
+    args = parser.parse_args()
+
+    results = sync_benchmarks(args.scale, args.rounds) + asyncio.run(async_benchmarks(args.scale, args.rounds))
+
+    with open(args.output, "w") as output_file:
+        dump(
+            {
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "benchmarks": results,
+            },
+            output_file,
+            indent=4
+        )
+
+    if args.compare:
+        compare(results, args.compare)
+    else:
+        for result in results:
+            print(f"{result['name']:<40} {result['median_us']:>12.2f}us")
+
+
+if __name__ == "__main__":
+    main()
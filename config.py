@@ -7,3 +7,124 @@ SERVER_URI = f"{environ.get("SERVER_HOST")}:{environ.get("SERVER_PORT")}"
 TELEGRAM_BOT_TOKEN = environ.get("TELEGRAM_BOT_TOKEN")
 INTERNAL_SECRET = environ.get("INTERNAL_SECRET")
 TOKEN_EXPIRATION = timedelta(minutes=1)
+
+# Shared TempTake HTTP client
+HTTP_MAX_CONNECTIONS = int(environ.get("HTTP_MAX_CONNECTIONS", 100))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(environ.get("HTTP_MAX_KEEPALIVE_CONNECTIONS", 20))
+HTTP_KEEPALIVE_EXPIRY = float(environ.get("HTTP_KEEPALIVE_EXPIRY", 30))
+HTTP_TIMEOUT = float(environ.get("HTTP_TIMEOUT", 10))
+HTTP_CONNECT_TIMEOUT = float(environ.get("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_RETRIES = int(environ.get("HTTP_RETRIES", 2))
+HTTP_RETRY_BACKOFF = float(environ.get("HTTP_RETRY_BACKOFF", 0.2))
+BREAKER_FAILURE_THRESHOLD = int(environ.get("BREAKER_FAILURE_THRESHOLD", 5))
+BREAKER_RESET_TIMEOUT = float(environ.get("BREAKER_RESET_TIMEOUT", 30))
+HTTP2_ENABLED = environ.get("HTTP2_ENABLED", "false").lower() == "true"
+
+# JWT reuse
+TOKEN_CACHE_SIZE = int(environ.get("TOKEN_CACHE_SIZE", 1024))
+TOKEN_REFRESH_MARGIN = timedelta(seconds=int(environ.get("TOKEN_REFRESH_MARGIN_SECONDS", 15)))
+
+# Group/manager/worker topology cache
+TOPOLOGY_CACHE_TTL = float(environ.get("TOPOLOGY_CACHE_TTL", 60))
+TOPOLOGY_CACHE_SIZE = int(environ.get("TOPOLOGY_CACHE_SIZE", 4096))
+
+# Chart rendering
+CHART_WORKERS = int(environ.get("CHART_WORKERS", 2))
+CHART_CACHE_SIZE = int(environ.get("CHART_CACHE_SIZE", 256))
+CHART_CACHE_BUCKET = int(environ.get("CHART_CACHE_BUCKET_SECONDS", 300))
+CHART_POINTS = int(environ.get("CHART_POINTS", 400))
+
+# CSV exports, Telegram bots can upload documents of up to 50 MB
+EXPORT_DAYS = int(environ.get("EXPORT_DAYS", 7))
+EXPORT_BATCH_SIZE = int(environ.get("EXPORT_BATCH_SIZE", 500))
+EXPORT_MAX_BYTES = int(environ.get("EXPORT_MAX_BYTES", 50 * 1024 * 1024))
+
+# Group dashboard
+DASHBOARD_CONCURRENCY = int(environ.get("DASHBOARD_CONCURRENCY", 8))
+DASHBOARD_MAX_LENGTH = int(environ.get("DASHBOARD_MAX_LENGTH", 3800))
+
+# Adding many managers or workers at once from a pasted list or a CSV file
+BULK_CONCURRENCY = int(environ.get("BULK_CONCURRENCY", 4))
+BULK_MAX_MACS = int(environ.get("BULK_MAX_MACS", 500))
+BULK_MAX_FILE_SIZE = int(environ.get("BULK_MAX_FILE_SIZE", 1024 * 1024))
+
+# Paginated replies
+PAGE_SIZE = int(environ.get("PAGE_SIZE", 3500))
+PAGE_STORE_SIZE = int(environ.get("PAGE_STORE_SIZE", 512))
+PAGE_STORE_TTL = float(environ.get("PAGE_STORE_TTL", 900))
+
+# Update delivery, "polling" or "webhook"
+BOT_MODE = environ.get("BOT_MODE", "polling")
+WEBHOOK_LISTEN = environ.get("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(environ.get("WEBHOOK_PORT", 8443))
+WEBHOOK_PATH = environ.get("WEBHOOK_PATH", "/telegram")
+WEBHOOK_URL = environ.get("WEBHOOK_URL")
+WEBHOOK_SECRET = environ.get("WEBHOOK_SECRET")
+HTTP_SERVER_MAX_BODY = int(environ.get("HTTP_SERVER_MAX_BODY", 1024 * 1024))
+HTTP_SERVER_SHUTDOWN_TIMEOUT = float(environ.get("HTTP_SERVER_SHUTDOWN_TIMEOUT", 10))
+
+# Update scheduling
+UPDATE_CONCURRENCY = int(environ.get("UPDATE_CONCURRENCY", 32))
+UPDATE_MAX_PENDING = int(environ.get("UPDATE_MAX_PENDING", 1024))
+UPDATE_CHAT_QUEUE_LIMIT = int(environ.get("UPDATE_CHAT_QUEUE_LIMIT", 20))
+
+# Worker processes updates are partitioned to by chat id, 0 or 1 handles everything in this process.
+# SHARD_INDEX is set by the supervisor for the workers it starts.
+# The supervisor serves the ingestion endpoint and sends pushed entries to every worker.
+SHARD_WORKERS = int(environ.get("SHARD_WORKERS", 0))
+SHARD_INDEX = int(environ["SHARD_INDEX"]) if environ.get("SHARD_INDEX") else None
+SHARD_HEARTBEAT_FD = int(environ.get("SHARD_HEARTBEAT_FD", -1))
+SHARD_HEARTBEAT_INTERVAL = float(environ.get("SHARD_HEARTBEAT_INTERVAL", 5))
+SHARD_HEARTBEAT_TIMEOUT = float(environ.get("SHARD_HEARTBEAT_TIMEOUT", 30))
+SHARD_RESTART_DELAY = float(environ.get("SHARD_RESTART_DELAY", 1))
+SHARD_QUEUE_SIZE = int(environ.get("SHARD_QUEUE_SIZE", 1000))
+
+# Pending conversation state, "memory" or "sqlite"
+STATE_BACKEND = environ.get("STATE_BACKEND", "memory")
+STATE_SQLITE_PATH = environ.get("STATE_SQLITE_PATH", "state.db")
+STATE_TTL = float(environ.get("STATE_TTL", 600))
+STATE_MAX_SIZE = int(environ.get("STATE_MAX_SIZE", 10000))
+
+# Outbound Telegram dispatcher
+SEND_GLOBAL_RATE = float(environ.get("SEND_GLOBAL_RATE", 30))
+SEND_GLOBAL_BURST = int(environ.get("SEND_GLOBAL_BURST", 30))
+SEND_CHAT_RATE = float(environ.get("SEND_CHAT_RATE", 1))
+SEND_GROUP_CHAT_RATE = float(environ.get("SEND_GROUP_CHAT_RATE", 20 / 60))
+SEND_CHAT_BURST = int(environ.get("SEND_CHAT_BURST", 3))
+SEND_MAX_RETRIES = int(environ.get("SEND_MAX_RETRIES", 3))
+
+# Edit-in-place menus
+MENU_RENDER_CACHE_SIZE = int(environ.get("MENU_RENDER_CACHE_SIZE", 4096))
+
+# Callback data that does not fit in Telegram's 64 bytes is kept in a table
+PAYLOAD_TABLE_SIZE = int(environ.get("PAYLOAD_TABLE_SIZE", 10000))
+
+# Prometheus metrics, set METRICS_PORT to an empty value to disable
+METRICS_LISTEN = environ.get("METRICS_LISTEN", "127.0.0.1")
+METRICS_PORT = int(environ.get("METRICS_PORT", 9090) or 0)
+EVENT_LOOP_LAG_INTERVAL = float(environ.get("EVENT_LOOP_LAG_INTERVAL", 0.5))
+
+# Comma separated chat ids allowed to use the inline menus, empty allows everyone
+ALLOWED_CHAT_IDS = {int(chat_id) for chat_id in environ.get("ALLOWED_CHAT_IDS", "").split(",") if chat_id.strip()}
+
+# Threshold alerts
+ALERTS_ENABLED = environ.get("ALERTS_ENABLED", "true").lower() == "true"
+ALERTS_DB_PATH = environ.get("ALERTS_DB_PATH", "alerts.db")
+ALERT_POLL_INTERVAL = float(environ.get("ALERT_POLL_INTERVAL", 60))
+ALERT_POLL_JITTER = float(environ.get("ALERT_POLL_JITTER", 10))
+ALERT_POLL_CONCURRENCY = int(environ.get("ALERT_POLL_CONCURRENCY", 8))
+
+# Entries pushed by the TempTake server, set INGEST_PORT to an empty value to disable
+INGEST_LISTEN = environ.get("INGEST_LISTEN", "0.0.0.0")
+INGEST_PORT = int(environ.get("INGEST_PORT", 8081) or 0)
+INGEST_PATH = environ.get("INGEST_PATH", "/internal/entries")
+# Audience the server's tokens must carry, so tokens the bot signs for API calls are not accepted
+INGEST_AUDIENCE = environ.get("INGEST_AUDIENCE", "temptake-bot-ingest")
+LATEST_ENTRY_CACHE_SIZE = int(environ.get("LATEST_ENTRY_CACHE_SIZE", 10000))
+
+# Local cache of module entries, set SERIES_SQLITE_PATH to persist it between restarts
+SERIES_CACHE_SIZE = int(environ.get("SERIES_CACHE_SIZE", 256))
+SERIES_MAX_POINTS = int(environ.get("SERIES_MAX_POINTS", 20000))
+SERIES_RETENTION = float(environ.get("SERIES_RETENTION", 7 * 24 * 60 * 60))
+SERIES_SETTLE = float(environ.get("SERIES_SETTLE", 120))
+SERIES_SQLITE_PATH = environ.get("SERIES_SQLITE_PATH", "")
@@ -0,0 +1,8 @@
+from enum import IntEnum
+
+
+# Exported as a gauge, so the values are numbers
+class BreakerState(IntEnum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
@@ -4,6 +4,10 @@ from enum import Enum
 class ButtonAction(Enum):
     ADD = "add"
     DAY = "day"
+    CHART = "chart"
+    ALERT = "alert"
     SELECT = "select"
     LAST = "last"
     DELETE = "delete"
+    EXPORT = "export"
+    DASHBOARD = "dashboard"
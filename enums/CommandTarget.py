@@ -4,3 +4,4 @@ class CommandTarget(Enum):
     START_COMMAND = "start"
     MANAGER_COMMAND = "manager"
     GROUPS_COMMAND = "groups"
+    ALERTS_COMMAND = "alerts"
@@ -11,3 +11,6 @@ class JsonIdentifier(Enum):
     MAC_KEY = "mac"
     START_TIMESTAMP_KEY = "from"
     END_TIMESTAMP_KEY = "to"
+    TIMESTAMP_KEY = "timestamp"
+    MANAGER_ID_KEY = "managerId"
+    WORKER_ID_KEY = "workerId"
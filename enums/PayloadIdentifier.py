@@ -7,3 +7,5 @@ class PayloadIdentifier(Enum):
     GROUP_IDENTIFIER = "g"
     MANAGER_IDENTIFIER = "m"
     WORKER_IDENTIFIER = "w"
+    PAGE_IDENTIFIER = "p"
+    SUBSCRIPTION_IDENTIFIER = "s"
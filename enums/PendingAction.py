@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class PendingAction(Enum):
+    ADD_MANAGER = "add_manager"
+    ADD_WORKER = "add_worker"
+    ADD_ALERT = "add_alert"
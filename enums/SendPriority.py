@@ -0,0 +1,7 @@
+from enum import IntEnum
+
+
+# Lower values are sent first
+class SendPriority(IntEnum):
+    INTERACTIVE = 0
+    BULK = 10
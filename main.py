@@ -1,18 +1,90 @@
-from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler, MessageHandler, filters
+import asyncio
+
+from telegram.ext import Application, ApplicationBuilder, CommandHandler, CallbackQueryHandler, MessageHandler, filters
 
 from service.telegram.buttons import button_handler
 from service.telegram.commands import *
 
-from config import TELEGRAM_BOT_TOKEN
+from config import TELEGRAM_BOT_TOKEN, BOT_MODE, SHARD_WORKERS, SHARD_INDEX
 from enums.CommandTarget import *
+from service.alerts.poller import start_alerts, stop_alerts
+from service.alerts.store import close_subscription_store
+from service.metrics import register_stats, start_metrics, stop_metrics
+from service.telegram.alerts import list_alerts
+from service.telegram.charts import shutdown_chart_pool
+from service.telegram.export import cancel_exports
+from service.telegram.dispatcher import OutboundDispatcher
 from service.telegram.messages import message_handler
+from service.telegram.provisioning import cancel_provisionings
+from service.telegram.state import close_state_store
+from service.telegram.update_processor import ChatOrderedUpdateProcessor
+from service.telegram.sharding import create_supervisor_application, run_shard_worker
+from service.telegram.webhook import run_webhook
+from service.temptake.breaker import circuit_breaker
+from service.temptake.cache import topology_cache
+from service.temptake.client import open_client, close_client
+from service.temptake.ingest import start_ingest, stop_ingest
+from service.temptake.latest import latest_entries
+from service.temptake.requests import request_stats
+from service.temptake.series import series_cache, close_series_cache
+from util.security import token_cache
+
+
+async def post_init(application: Application) -> None:
+    await open_client(application)
+    await start_metrics(application)
+    await start_alerts(application)
+    await start_ingest(application)
+
+
+async def post_shutdown(application: Application) -> None:
+    await stop_ingest(application)
+    await stop_alerts(application)
+    await stop_metrics(application)
+    await cancel_exports(application)
+    await cancel_provisionings(application)
+    await shutdown_chart_pool(application)
+    await close_state_store(application)
+    await close_series_cache(application)
+    await close_subscription_store(application)
+    await close_client(application)
+
+
+update_processor = ChatOrderedUpdateProcessor()
+outbound_dispatcher = OutboundDispatcher()
+
+register_stats("temptake_bot_update_processor", "Update scheduler queue statistics.", update_processor.stats)
+register_stats("temptake_bot_outbound_dispatcher", "Outbound Telegram dispatcher statistics.", outbound_dispatcher.stats)
+register_stats("temptake_bot_token_cache", "JWT cache statistics.", token_cache.stats)
+register_stats("temptake_bot_topology_cache", "Topology cache statistics.", topology_cache.stats)
+register_stats("temptake_bot_latest_entries", "Modules with a pushed latest entry.", latest_entries.stats)
+register_stats("temptake_bot_series_cache", "Local entry cache statistics.", series_cache.stats)
+register_stats("temptake_bot_circuit_breaker", "TempTake circuit breaker state and counters.", circuit_breaker.stats)
+register_stats("temptake_bot_requests", "TempTake request deduplication and retries.", request_stats)
 
-app = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+app = (
+    ApplicationBuilder()
+    .token(TELEGRAM_BOT_TOKEN)
+    .concurrent_updates(update_processor)
+    .rate_limiter(outbound_dispatcher)
+    .post_init(post_init)
+    .post_shutdown(post_shutdown)
+    .build()
+)
 app.add_handler(CommandHandler(CommandTarget.START_COMMAND.value, start))
 app.add_handler(CommandHandler(CommandTarget.MANAGER_COMMAND.value, add_manager))
 app.add_handler(CommandHandler(CommandTarget.GROUPS_COMMAND.value, get_user_groups))
+app.add_handler(CommandHandler(CommandTarget.ALERTS_COMMAND.value, list_alerts))
 app.add_handler(CallbackQueryHandler(button_handler))
-app.add_handler(MessageHandler(filters.TEXT, message_handler))
+app.add_handler(MessageHandler(filters.TEXT | filters.Document.ALL, message_handler))
 
 if __name__ == "__main__":
-    app.run_polling()
+    if SHARD_INDEX is not None:
+        asyncio.run(run_shard_worker(app))
+    else:
+        # With several workers this process only receives updates and forwards each to the worker owning its chat
+        receiving_app = create_supervisor_application(SHARD_WORKERS) if SHARD_WORKERS > 1 else app
+        if BOT_MODE == "webhook":
+            asyncio.run(run_webhook(receiving_app))
+        else:
+            receiving_app.run_polling()
@@ -0,0 +1,202 @@
+from asyncio import Semaphore, Task, create_task, gather, sleep
+from datetime import datetime, timezone
+from logging import getLogger
+from operator import gt, lt, ge, le
+from random import uniform
+from typing import Any, Callable
+
+from telegram import Bot
+from telegram.error import TelegramError
+
+from config import ALERTS_ENABLED, ALERT_POLL_INTERVAL, ALERT_POLL_JITTER, ALERT_POLL_CONCURRENCY
+from enums.Endpoint import Endpoint
+from enums.JsonIdentifier import JsonIdentifier
+from enums.Method import Method
+from enums.PayloadIdentifier import PayloadIdentifier
+from enums.SendPriority import SendPriority
+from service.alerts.store import Subscription, SubscriptionStore, get_subscription_store
+from service.metrics import register_stats
+from service.temptake.latest import latest_entries
+from service.temptake.requests import make_request
+from util.statistics import get_entry_timestamp
+
+
+logger = getLogger(__name__)
+
+OPERATORS: dict[str, Callable[[float, float], bool]] = {">": gt, "<": lt, ">=": ge, "<=": le}
+
+LAST_ENTRY_ENDPOINTS = {
+    PayloadIdentifier.MANAGER_IDENTIFIER.value: Endpoint.ENTRY_MANAGER_LAST,
+    PayloadIdentifier.WORKER_IDENTIFIER.value: Endpoint.ENTRY_WORKER_LAST,
+}
+
+MODULE_NAMES = {
+    PayloadIdentifier.MANAGER_IDENTIFIER.value: "Manager",
+    PayloadIdentifier.WORKER_IDENTIFIER.value: "Worker",
+}
+
+
+def get_subscription_credentials(subscription: Subscription) -> dict[str, str]:
+    return {
+        JsonIdentifier.TELEGRAM_ID_KEY.value: str(subscription.chat_id),
+        JsonIdentifier.TELEGRAM_USERNAME_KEY.value: subscription.username,
+    }
+
+
+# The last-entry endpoints may answer with one entry or a list of them
+def latest_entry(payload: Any) -> dict[str, Any] | None:
+    if isinstance(payload, dict):
+        return payload
+    if isinstance(payload, list) and payload:
+        return max(payload, key=lambda entry: get_entry_timestamp(entry) or datetime.min.replace(tzinfo=timezone.utc))
+    return None
+
+
+def is_breached(subscription: Subscription, entry: dict[str, Any]) -> bool | None:
+    value = entry.get(subscription.metric)
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        return None
+    return OPERATORS[subscription.operator](value, subscription.threshold)
+
+
+def format_alert(subscription: Subscription, entry: dict[str, Any]) -> str:
+    module_name = MODULE_NAMES.get(subscription.identifier, "Module")
+    return (
+        f"Alert: {module_name} {subscription.module_id} {subscription.metric} is {entry[subscription.metric]}, "
+        f"threshold {subscription.operator} {subscription.threshold:g}"
+    )
+
+
+# Polls each subscribed module once per interval, however many chats subscribed to it
+class AlertPoller:
+    def __init__(
+        self,
+        bot: Bot,
+        store: SubscriptionStore,
+        interval: float = ALERT_POLL_INTERVAL,
+        jitter: float = ALERT_POLL_JITTER,
+        concurrency: int = ALERT_POLL_CONCURRENCY
+    ):
+        self.bot = bot
+        self.store = store
+        self.interval = interval
+        self.jitter = jitter
+        self.concurrency = concurrency
+        self.polls = 0
+        self.alerts_sent = 0
+        self._task: Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.poll_once()
+            except Exception:
+                logger.exception("Alert polling failed")
+            await sleep(max(0.0, self.interval + uniform(-self.jitter, self.jitter)))
+
+    async def poll_once(self) -> None:
+        modules: dict[tuple[str, int], list[Subscription]] = {}
+        for subscription in await self.store.all():
+            modules.setdefault((subscription.identifier, subscription.module_id), []).append(subscription)
+
+        semaphore = Semaphore(self.concurrency)
+        await gather(*(
+            self._poll_module(identifier, module_id, subscriptions, semaphore)
+            for (identifier, module_id), subscriptions in modules.items()
+        ))
+
+    async def _fetch_last_entry(self, identifier: str, module_id: int, subscriptions: list[Subscription]) -> Any:
+        # Any subscriber may read the module, fall back to the next one if a subscriber lost access
+        tried = set()
+        for subscription in subscriptions:
+            if subscription.chat_id in tried:
+                continue
+            tried.add(subscription.chat_id)
+
+            response = await make_request(
+                method=Method.GET,
+                endpoint=LAST_ENTRY_ENDPOINTS[identifier],
+                update=None,
+                json={JsonIdentifier.ID_KEY.value: module_id},
+                credentials=get_subscription_credentials(subscription)
+            )
+            if response.is_success:
+                return response.json()
+        return None
+
+    async def _poll_module(
+        self, identifier: str, module_id: int, subscriptions: list[Subscription], semaphore: Semaphore
+    ) -> None:
+        # Spread the requests over the jitter window instead of bursting them all at once
+        await sleep(uniform(0, self.jitter))
+
+        # Modules the TempTake server pushed an entry for were already checked on arrival
+        if latest_entries.is_fresh(identifier, module_id, self.interval):
+            return
+
+        async with semaphore:
+            self.polls += 1
+            payload = await self._fetch_last_entry(identifier, module_id, subscriptions)
+
+        entry = latest_entry(payload)
+        if entry is not None:
+            await self.process_entry(entry, subscriptions)
+
+    # Alert the subscriptions whose threshold the entry newly breaches
+    async def process_entry(self, entry: dict[str, Any], subscriptions: list[Subscription]) -> None:
+        fired, cleared = [], []
+        for subscription in subscriptions:
+            breached = is_breached(subscription, entry)
+            if breached is None:
+                continue
+            if breached and not subscription.triggered:
+                fired.append(subscription)
+            elif not breached and subscription.triggered:
+                cleared.append(subscription)
+
+        await self.store.set_triggered([subscription.id for subscription in fired], True)
+        await self.store.set_triggered([subscription.id for subscription in cleared], False)
+
+        for subscription in fired:
+            try:
+                await self.bot.send_message(
+                    chat_id=subscription.chat_id,
+                    text=format_alert(subscription, entry),
+                    rate_limit_args={"priority": SendPriority.BULK}
+                )
+                self.alerts_sent += 1
+            except TelegramError:
+                logger.exception("Could not deliver alert to chat %s", subscription.chat_id)
+
+    def stats(self) -> dict[str, int]:
+        return {"polls": self.polls, "alerts_sent": self.alerts_sent}
+
+
+alert_poller: AlertPoller | None = None
+
+
+# Application post_init hook
+async def start_alerts(application) -> None:
+    global alert_poller
+    if not ALERTS_ENABLED:
+        return
+    alert_poller = AlertPoller(application.bot, get_subscription_store())
+    register_stats("temptake_bot_alerts", "Alert polling statistics.", alert_poller.stats)
+    alert_poller.start()
+
+
+# Application post_shutdown hook
+async def stop_alerts(*_) -> None:
+    global alert_poller
+    if alert_poller is not None:
+        await alert_poller.stop()
+        alert_poller = None
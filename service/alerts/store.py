@@ -0,0 +1,113 @@
+import sqlite3
+from asyncio import to_thread
+from threading import Lock
+from typing import NamedTuple
+
+from config import ALERTS_DB_PATH
+
+
+class Subscription(NamedTuple):
+    id: int
+    chat_id: int
+    username: str | None
+    identifier: str
+    module_id: int
+    metric: str
+    operator: str
+    threshold: float
+    # Whether the last polled value already breached the threshold, alerts fire on the transition
+    triggered: bool
+
+
+# Persistent threshold subscriptions, shared by every process using the same database file
+class SubscriptionStore:
+    def __init__(self, path: str = ALERTS_DB_PATH):
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS subscriptions ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, chat_id INTEGER NOT NULL, username TEXT, "
+            "identifier TEXT NOT NULL, module_id INTEGER NOT NULL, metric TEXT NOT NULL, "
+            "operator TEXT NOT NULL, threshold REAL NOT NULL, triggered INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS subscriptions_module ON subscriptions (identifier, module_id)"
+        )
+
+    def _execute(self, statement: str, parameters: tuple = ()) -> list[tuple]:
+        with self._lock:
+            return self._connection.execute(statement, parameters).fetchall()
+
+    async def add(
+        self,
+        chat_id: int,
+        username: str | None,
+        identifier: str,
+        module_id: int,
+        metric: str,
+        operator: str,
+        threshold: float
+    ) -> None:
+        await to_thread(
+            self._execute,
+            "INSERT INTO subscriptions (chat_id, username, identifier, module_id, metric, operator, threshold) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (chat_id, username, identifier, module_id, metric, operator, threshold)
+        )
+
+    async def remove(self, subscription_id: int, chat_id: int) -> bool:
+        rows = await to_thread(
+            self._execute,
+            "DELETE FROM subscriptions WHERE id = ? AND chat_id = ? RETURNING id",
+            (subscription_id, chat_id)
+        )
+        return bool(rows)
+
+    async def for_chat(self, chat_id: int) -> list[Subscription]:
+        rows = await to_thread(self._execute, "SELECT * FROM subscriptions WHERE chat_id = ? ORDER BY id", (chat_id,))
+        return [Subscription(*row[:-1], bool(row[-1])) for row in rows]
+
+    async def for_module(self, identifier: str, module_id: int) -> list[Subscription]:
+        rows = await to_thread(
+            self._execute,
+            "SELECT * FROM subscriptions WHERE identifier = ? AND module_id = ?",
+            (identifier, module_id)
+        )
+        return [Subscription(*row[:-1], bool(row[-1])) for row in rows]
+
+    async def all(self) -> list[Subscription]:
+        rows = await to_thread(self._execute, "SELECT * FROM subscriptions")
+        return [Subscription(*row[:-1], bool(row[-1])) for row in rows]
+
+    async def set_triggered(self, subscription_ids: list[int], triggered: bool) -> None:
+        if not subscription_ids:
+            return
+        placeholders = ",".join("?" * len(subscription_ids))
+        await to_thread(
+            self._execute,
+            f"UPDATE subscriptions SET triggered = ? WHERE id IN ({placeholders})",
+            (int(triggered), *subscription_ids)
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+subscription_store: SubscriptionStore | None = None
+
+
+def get_subscription_store() -> SubscriptionStore:
+    global subscription_store
+    if subscription_store is None:
+        subscription_store = SubscriptionStore()
+    return subscription_store
+
+
+# Application post_shutdown hook
+async def close_subscription_store(*_) -> None:
+    global subscription_store
+    if subscription_store is not None:
+        subscription_store.close()
+        subscription_store = None
@@ -0,0 +1,99 @@
+from asyncio import Task, create_task, get_running_loop, sleep
+from functools import wraps
+from time import perf_counter
+from typing import Any, Awaitable, Callable
+
+from config import METRICS_LISTEN, METRICS_PORT, EVENT_LOOP_LAG_INTERVAL
+from util.http_server import HttpServer, HttpRequest, HttpResponse
+from util.metrics import Registry, Histogram, Counter, CallbackGauge
+
+
+registry = Registry()
+
+handler_seconds = registry.register(Histogram(
+    "temptake_bot_handler_seconds",
+    "Time spent in Telegram update handlers.",
+    ("handler", "identifier", "action")
+))
+temptake_request_seconds = registry.register(Histogram(
+    "temptake_bot_temptake_request_seconds",
+    "Latency of TempTake API requests.",
+    ("endpoint", "method")
+))
+temptake_responses = registry.register(Counter(
+    "temptake_bot_temptake_responses_total",
+    "TempTake API responses by status code.",
+    ("endpoint", "method", "status")
+))
+telegram_request_seconds = registry.register(Histogram(
+    "temptake_bot_telegram_request_seconds",
+    "Latency of Telegram Bot API calls, excluding time spent waiting for rate limits.",
+    ("method",)
+))
+event_loop_lag_seconds = registry.register(Histogram(
+    "temptake_bot_event_loop_lag_seconds",
+    "Delay between when the event loop should have woken a timer and when it did.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+))
+
+
+# Expose a component's stats() dict as a gauge labelled by stat name
+def register_stats(name: str, documentation: str, stats: Callable[[], dict[str, float]]) -> None:
+    registry.register(CallbackGauge(
+        name,
+        documentation,
+        ("stat",),
+        lambda: {(stat,): value for stat, value in stats().items()}
+    ))
+
+
+# Record the latency of a Telegram handler
+def timed_handler(name: str) -> Callable:
+    def decorator(handler: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @wraps(handler)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            started = perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                handler_seconds.observe(perf_counter() - started, name, "", "")
+        return wrapper
+    return decorator
+
+
+_lag_monitor: Task | None = None
+_metrics_server: HttpServer | None = None
+
+
+async def _monitor_event_loop_lag(interval: float) -> None:
+    loop = get_running_loop()
+    while True:
+        expected = loop.time() + interval
+        await sleep(interval)
+        event_loop_lag_seconds.observe(max(0.0, loop.time() - expected))
+
+
+async def _serve_metrics(_: HttpRequest) -> HttpResponse:
+    return HttpResponse(200, registry.render().encode(), "text/plain; version=0.0.4; charset=utf-8")
+
+
+# Application post_init hook
+async def start_metrics(*_) -> None:
+    global _lag_monitor, _metrics_server
+    if not METRICS_PORT:
+        return
+
+    _lag_monitor = create_task(_monitor_event_loop_lag(EVENT_LOOP_LAG_INTERVAL))
+    _metrics_server = HttpServer(METRICS_LISTEN, METRICS_PORT).route("GET", "/metrics", _serve_metrics)
+    await _metrics_server.start()
+
+
+# Application post_shutdown hook
+async def stop_metrics(*_) -> None:
+    global _lag_monitor, _metrics_server
+    if _lag_monitor is not None:
+        _lag_monitor.cancel()
+        _lag_monitor = None
+    if _metrics_server is not None:
+        await _metrics_server.stop()
+        _metrics_server = None
@@ -0,0 +1,118 @@
+from re import compile as compile_regex
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from enums.ButtonAction import ButtonAction
+from enums.Endpoint import Endpoint
+from enums.JsonIdentifier import JsonIdentifier
+from enums.Method import Method
+from enums.PayloadIdentifier import PayloadIdentifier
+from enums.PendingAction import PendingAction
+from service.alerts.poller import MODULE_NAMES
+from service.alerts.store import get_subscription_store
+from service.metrics import timed_handler
+from service.telegram.KeyboardBuilder import KeyboardBuilder
+from service.telegram.error_handlers import reply_if_error
+from service.telegram.router import CallbackRequest
+from service.telegram.state import state_store
+from service.temptake.requests import make_request
+from util.payload import create_payload
+
+
+THRESHOLD_PATTERN = compile_regex(r"^\s*(\w+)\s*(>=|<=|>|<)\s*(-?\d+(?:\.\d+)?)\s*$")
+
+MODULE_ENDPOINTS = {
+    PayloadIdentifier.MANAGER_IDENTIFIER.value: Endpoint.MANAGER,
+    PayloadIdentifier.WORKER_IDENTIFIER.value: Endpoint.WORKER,
+}
+
+
+# Ask for the threshold of a new alert on a manager or worker
+async def handle_alert(request: CallbackRequest) -> None:
+    await state_store.set(
+        PendingAction.ADD_ALERT,
+        request.update.effective_chat.id,
+        {"identifier": request.identifier.value, "module_id": int(request.obj_id)}
+    )
+    await request.context.bot.send_message(
+        chat_id=request.update.effective_chat.id,
+        text="Please send the alert threshold, for example: temperature > 30"
+    )
+
+
+async def handle_delete_subscription(request: CallbackRequest) -> None:
+    removed = await get_subscription_store().remove(int(request.obj_id), request.update.effective_chat.id)
+    await request.context.bot.send_message(
+        chat_id=request.update.effective_chat.id,
+        text="Alert removed." if removed else "This alert no longer exists."
+    )
+
+
+# Create the subscription from the threshold the user sent after pressing "Alerts"
+async def add_alert_from_message(update: Update, context: ContextTypes.DEFAULT_TYPE, pending: dict) -> None:
+    match = THRESHOLD_PATTERN.match(update.message.text)
+    if match is None:
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="Could not read the threshold, expected something like: temperature > 30"
+        )
+        return
+
+    metric, operator, threshold = match.groups()
+
+    # Alerts are polled with the subscriber's credentials, so only accept modules the user can read
+    module_response = await make_request(
+        method=Method.GET,
+        endpoint=MODULE_ENDPOINTS[pending["identifier"]],
+        update=update,
+        json={JsonIdentifier.ID_KEY.value: pending["module_id"]}
+    )
+
+    if await reply_if_error(module_response, update, context):
+        return
+
+    await get_subscription_store().add(
+        chat_id=update.effective_chat.id,
+        username=update.effective_chat.username,
+        identifier=pending["identifier"],
+        module_id=pending["module_id"],
+        metric=metric,
+        operator=operator,
+        threshold=float(threshold)
+    )
+
+    module_name = MODULE_NAMES[pending["identifier"]]
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text=f"Alert added: {module_name} {pending['module_id']} {metric} {operator} {threshold}"
+    )
+
+
+# List the chat's alerts with buttons to remove them
+@timed_handler("list_alerts")
+async def list_alerts(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    subscriptions = await get_subscription_store().for_chat(update.effective_chat.id)
+
+    if not subscriptions:
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="You have no alerts. Open a manager or worker and press \"Alerts\" to add one."
+        )
+        return
+
+    keyboard_builder = KeyboardBuilder()
+    for subscription in subscriptions:
+        keyboard_builder.add_row().add_row_button(
+            text=(
+                f"Remove {MODULE_NAMES[subscription.identifier]} {subscription.module_id}: "
+                f"{subscription.metric} {subscription.operator} {subscription.threshold:g}"
+            ),
+            callback_data=create_payload(PayloadIdentifier.SUBSCRIPTION_IDENTIFIER, subscription.id, ButtonAction.DELETE)
+        )
+
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text="Your alerts:",
+        reply_markup=keyboard_builder.build()
+    )
@@ -8,19 +8,26 @@ from enums.ButtonAction import ButtonAction
 from enums.Endpoint import Endpoint
 from enums.JsonIdentifier import *
 from enums.Method import Method
+from enums.PendingAction import PendingAction
 from enums.PayloadIdentifier import *
 
 from service.telegram.KeyboardBuilder import KeyboardBuilder
-from service.telegram.error_handlers import reply_if_error
+from service.telegram.alerts import handle_alert, handle_delete_subscription
+from service.telegram.charts import send_chart_for_period
+from service.telegram.dashboard import send_dashboard_for_group
+from service.telegram.export import send_export_for_period
+from service.telegram.pagination import send_paginated, show_page
+from service.telegram.middleware import timing_middleware, error_middleware, auth_middleware, request_cache_middleware
+from service.telegram.render import send_or_edit_menu
+from service.telegram.router import CallbackRouter, CallbackRequest
+from service.telegram.state import state_store
+from service.telegram.error_handlers import raise_for_errors
+from service.temptake.latest import latest_entries
+from service.temptake.loaders import RequestSpec, load_all, load_module
 from service.temptake.requests import make_request
+from service.temptake.series import series_cache
 from util.payload import split_payload, create_payload
-
-
-# Dict of IDs waiting for a worker to be added pointing to the manager's ID
-awaiting_worker_mac: dict[int, int] = {}
-
-# Dict of IDs waiting for a manager to be added pointing to the group's ID
-awaiting_manager_mac: dict[int, int] = {}
+from util.statistics import summarize_stream, format_summary, parse_timestamp
 
 
 def add_module_rows(
@@ -45,6 +52,9 @@ def add_module_interactions(
     keyboard_builder.add_row_button(
         text="Get Day Data",
         callback_data=create_payload(identifier, json[JsonIdentifier.ID_KEY.value], ButtonAction.DAY)
+    ).add_row_button(
+        text="Day Chart",
+        callback_data=create_payload(identifier, json[JsonIdentifier.ID_KEY.value], ButtonAction.CHART)
     ).add_row_button(
         text="Get Select Data",
         callback_data=create_payload(identifier, json[JsonIdentifier.ID_KEY.value], ButtonAction.SELECT)
@@ -54,6 +64,12 @@ def add_module_interactions(
     )
 
     keyboard_builder.add_row().add_row_button(
+        text="Alerts",
+        callback_data=create_payload(identifier, json[JsonIdentifier.ID_KEY.value], ButtonAction.ALERT)
+    ).add_row_button(
+        text="Export CSV",
+        callback_data=create_payload(identifier, json[JsonIdentifier.ID_KEY.value], ButtonAction.EXPORT)
+    ).add_row_button(
         text="Delete",
         callback_data=create_payload(identifier, json[JsonIdentifier.ID_KEY.value], ButtonAction.DELETE)
     )
@@ -73,12 +89,16 @@ async def send_menu_for_group(
         name_key=JsonIdentifier.MAC_KEY,
         keyboard_builder=keyboard_builder
     ).add_row().add_row_button(
+        text="Dashboard",
+        callback_data=create_payload(PayloadIdentifier.GROUP_IDENTIFIER, group_id, ButtonAction.DASHBOARD)
+    ).add_row_button(
         text="Add Manager",
         callback_data=create_payload(PayloadIdentifier.GROUP_IDENTIFIER, group_id, ButtonAction.ADD)
     )
 
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
+    await send_or_edit_menu(
+        update=update,
+        context=context,
         text=message,
         reply_markup=keyboard_builder.build()
     )
@@ -111,8 +131,9 @@ async def send_menu_for_manager(
         callback_data=create_payload(PayloadIdentifier.MANAGER_IDENTIFIER, manager_response[JsonIdentifier.ID_KEY.value], ButtonAction.ADD)
     )
 
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
+    await send_or_edit_menu(
+        update=update,
+        context=context,
         text=message,
         reply_markup=keyboard_builder.build()
     )
@@ -132,12 +153,68 @@ async def send_menu_for_worker(
         keyboard_builder=keyboard_builder
     )
 
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
+    await send_or_edit_menu(
+        update=update,
+        context=context,
         text=message,
         reply_markup=keyboard_builder.build()
     )
 
+
+# Load everything a group menu needs and render it
+async def open_menu_for_group(update: Update, context: ContextTypes.DEFAULT_TYPE, group_id: str, group_name: str):
+    responses = await load_all(
+        update,
+        RequestSpec(Method.GET, Endpoint.GROUP_MANAGERS, {JsonIdentifier.ID_KEY.value: group_id})
+    )
+
+    raise_for_errors(*responses)
+
+    managers_response, = responses
+    await send_menu_for_group(
+        update=update,
+        context=context,
+        group_id=group_id,
+        group_name=group_name,
+        managers_list=managers_response.json()
+    )
+
+
+# Load the manager and its workers concurrently and render the manager menu
+async def open_menu_for_manager(update: Update, context: ContextTypes.DEFAULT_TYPE, manager_id: str):
+    responses = await load_all(
+        update,
+        RequestSpec(Method.GET, Endpoint.MANAGER, {JsonIdentifier.ID_KEY.value: manager_id}),
+        RequestSpec(Method.GET, Endpoint.MANAGER_WORKERS, {JsonIdentifier.ID_KEY.value: manager_id})
+    )
+
+    raise_for_errors(*responses)
+
+    manager_response, workers_response = responses
+    await send_menu_for_manager(
+        update=update,
+        context=context,
+        workers_list=workers_response.json(),
+        manager_response=manager_response.json()
+    )
+
+
+# Load the worker and render its menu
+async def open_menu_for_worker(update: Update, context: ContextTypes.DEFAULT_TYPE, worker_id: str):
+    responses = await load_all(
+        update,
+        RequestSpec(Method.GET, Endpoint.WORKER, {JsonIdentifier.ID_KEY.value: worker_id})
+    )
+
+    raise_for_errors(*responses)
+
+    worker_response, = responses
+    await send_menu_for_worker(
+        update=update,
+        context=context,
+        worker_response=worker_response.json()
+    )
+
 def get_iso(datetime_to_convert: datetime.datetime) -> str:
     return datetime_to_convert.isoformat(timespec="seconds")
 
@@ -151,34 +228,24 @@ async def send_data_for_period(
     end_timestamp: str = None
 ):
     if start_timestamp is None:
-        start_timestamp = get_iso(datetime.datetime.now() - datetime.timedelta(days=1))
+        start_timestamp = get_iso(datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(days=1))
 
     if end_timestamp is None:
-        end_timestamp = get_iso(datetime.datetime.now())
+        end_timestamp = get_iso(datetime.datetime.now(datetime.timezone.utc))
 
-    ep = Endpoint.ENTRY_WORKER if identifier == PayloadIdentifier.WORKER_IDENTIFIER else Endpoint.ENTRY_MANAGER
+    start, end = parse_timestamp(start_timestamp), parse_timestamp(end_timestamp)
+    entries = series_cache.stream(update, identifier, int(module_id), start, end)
 
-    entries_response = await make_request(
-        method=Method.GET,
-        endpoint=ep,
-        update=update,
-        json={
-            JsonIdentifier.ID_KEY.value: int(module_id),
-            JsonIdentifier.START_TIMESTAMP_KEY.value: start_timestamp,
-            JsonIdentifier.END_TIMESTAMP_KEY.value: end_timestamp
-        }
+    hourly = end - start <= datetime.timedelta(days=1)
+    summary = await summarize_stream(
+        entries,
+        bucket_size=datetime.timedelta(hours=1) if hourly else datetime.timedelta(days=1)
     )
-
-    if await reply_if_error(entries_response, update, context):
-        return
-
-    message = f"Data for period from {start_timestamp} to {end_timestamp}:\n```json\n{dumps(entries_response.json(), indent=4)}\n```"
-    message = message.replace("-", "\\-")
-
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        parse_mode="MarkdownV2",
-        text=message
+    await send_paginated(
+        update=update,
+        context=context,
+        title=f"Summary for period from {start_timestamp} to {end_timestamp}:",
+        chunks=format_summary(summary, bucket_format="%H:%M" if hourly else "%Y-%m-%d").split("\n")
     )
 
 
@@ -188,188 +255,195 @@ async def send_last_entry_data(
     identifier: PayloadIdentifier,
     module_id: str
 ):
-    ep = Endpoint.ENTRY_WORKER_LAST if identifier == PayloadIdentifier.WORKER_IDENTIFIER else Endpoint.ENTRY_MANAGER_LAST
+    pushed_entry = latest_entries.get(identifier.value, int(module_id))
+    if pushed_entry is not None:
+        # Pushed entries are shared between users, so check this user can see the module (cached per user)
+        raise_for_errors(await load_module(update, identifier, module_id))
+        entries_json = pushed_entry
+    else:
+        ep = Endpoint.ENTRY_WORKER_LAST if identifier == PayloadIdentifier.WORKER_IDENTIFIER else Endpoint.ENTRY_MANAGER_LAST
+
+        entries_response = await make_request(
+            method=Method.GET,
+            endpoint=ep,
+            update=update,
+            json={JsonIdentifier.ID_KEY.value: int(module_id)}
+        )
 
-    entries_response = await make_request(
-        method=Method.GET,
-        endpoint=ep,
-        update=update,
-        json={JsonIdentifier.ID_KEY.value: int(module_id)}
-    )
+        raise_for_errors(entries_response)
 
-    if await reply_if_error(entries_response, update, context):
-        return
+        entries_json = entries_response.json()
 
-    entries_json = entries_response.json()
+    if not isinstance(entries_json, list):
+        entries_json = [entries_json]
 
-    await context.bot.send_message(
-        chat_id=update.effective_chat.id,
-        parse_mode="MarkdownV2",
-        text=f"```\n{dumps(entries_json, indent=4)}\n```"
+    await send_paginated(
+        update=update,
+        context=context,
+        title="Last entry:",
+        chunks=(dumps(entry, indent=4) for entry in entries_json)
     )
 
 # day command
 async def send_day_data(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     ...
 
+
+MODULE_IDENTIFIERS = (PayloadIdentifier.MANAGER_IDENTIFIER, PayloadIdentifier.WORKER_IDENTIFIER)
+
+callback_router = (
+    CallbackRouter()
+    .use(timing_middleware)
+    .use(error_middleware)
+    .use(auth_middleware)
+    .use(request_cache_middleware)
+)
+
+
+@callback_router.route(PayloadIdentifier.PAGE_IDENTIFIER)
+async def handle_page(request: CallbackRequest) -> None:
+    await show_page(request.update, request.context, token=request.obj_id, page=int(request.name))
+
+
+@callback_router.route(PayloadIdentifier.GROUP_IDENTIFIER)
+async def handle_open_group(request: CallbackRequest) -> None:
+    await open_menu_for_group(request.update, request.context, request.obj_id, request.name)
+
+
+@callback_router.route(PayloadIdentifier.MANAGER_IDENTIFIER)
+async def handle_open_manager(request: CallbackRequest) -> None:
+    await open_menu_for_manager(request.update, request.context, request.obj_id)
+
+
+@callback_router.route(PayloadIdentifier.WORKER_IDENTIFIER)
+async def handle_open_worker(request: CallbackRequest) -> None:
+    await open_menu_for_worker(request.update, request.context, request.obj_id)
+
+
+callback_router.route(MODULE_IDENTIFIERS, ButtonAction.ALERT)(handle_alert)
+callback_router.route(PayloadIdentifier.SUBSCRIPTION_IDENTIFIER, ButtonAction.DELETE)(handle_delete_subscription)
+
+
+# The object a new MAC is added to, and what the prompt asks for
+ADD_PROMPTS = {
+    PayloadIdentifier.GROUP_IDENTIFIER: (PendingAction.ADD_MANAGER, "manager"),
+    PayloadIdentifier.MANAGER_IDENTIFIER: (PendingAction.ADD_WORKER, "worker"),
+}
+
+
+@callback_router.route(ADD_PROMPTS.keys(), ButtonAction.ADD)
+async def handle_add(request: CallbackRequest) -> None:
+    pending_action, module_name = ADD_PROMPTS[request.identifier]
+    await state_store.set(pending_action, request.update.effective_chat.id, int(request.obj_id))
+    await request.context.bot.send_message(
+        chat_id=request.update.effective_chat.id,
+        text=(
+            f"Please provide the MAC address of the {module_name} to add. "
+            f"To add several, send one per line or a CSV file with a mac column."
+        )
+    )
+
+
+@callback_router.route(PayloadIdentifier.GROUP_IDENTIFIER, ButtonAction.DASHBOARD)
+async def handle_dashboard(request: CallbackRequest) -> None:
+    await send_dashboard_for_group(request.update, request.context, request.obj_id)
+
+
+@callback_router.route(MODULE_IDENTIFIERS, ButtonAction.DAY)
+async def handle_day(request: CallbackRequest) -> None:
+    await send_data_for_period(
+        update=request.update,
+        context=request.context,
+        module_id=request.obj_id,
+        identifier=request.identifier
+    )
+
+
+@callback_router.route(MODULE_IDENTIFIERS, ButtonAction.CHART)
+async def handle_chart(request: CallbackRequest) -> None:
+    await send_chart_for_period(
+        update=request.update,
+        context=request.context,
+        module_id=request.obj_id,
+        identifier=request.identifier
+    )
+
+
+@callback_router.route(MODULE_IDENTIFIERS, ButtonAction.SELECT)
+async def handle_select(request: CallbackRequest) -> None:
+    # TODO: Implement select data functionality
+    await request.context.bot.send_message(
+        chat_id=request.update.effective_chat.id,
+        text=request.update.callback_query.data
+    )
+
+
+@callback_router.route(MODULE_IDENTIFIERS, ButtonAction.LAST)
+async def handle_last(request: CallbackRequest) -> None:
+    await send_last_entry_data(
+        update=request.update,
+        context=request.context,
+        module_id=request.obj_id,
+        identifier=request.identifier
+    )
+
+
+@callback_router.route(MODULE_IDENTIFIERS, ButtonAction.EXPORT)
+async def handle_export(request: CallbackRequest) -> None:
+    await send_export_for_period(
+        update=request.update,
+        context=request.context,
+        module_id=request.obj_id,
+        identifier=request.identifier
+    )
+
+
+# The endpoint deleting each kind of module, and its name in the confirmation
+DELETE_TARGETS = {
+    PayloadIdentifier.MANAGER_IDENTIFIER: (Endpoint.MANAGER, "Manager"),
+    PayloadIdentifier.WORKER_IDENTIFIER: (Endpoint.WORKER, "Worker"),
+}
+
+
+@callback_router.route(DELETE_TARGETS.keys(), ButtonAction.DELETE)
+async def handle_delete(request: CallbackRequest) -> None:
+    endpoint, module_name = DELETE_TARGETS[request.identifier]
+    response = await make_request(
+        method=Method.DELETE,
+        endpoint=endpoint,
+        update=request.update,
+        json={JsonIdentifier.ID_KEY.value: request.obj_id}
+    )
+
+    raise_for_errors(response)
+
+    await request.context.bot.send_message(
+        chat_id=request.update.effective_chat.id,
+        text=f"{module_name} with ID {request.obj_id} deleted successfully."
+    )
+
+
 # Handle button clicks for the inline keyboard
 async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     query = update.callback_query
-    await query.answer()
-
-    obj_identifier, obj_id, obj_name = split_payload(query.data)
-
-    # Check if the callback data starts with the group identifier
-    if obj_identifier == PayloadIdentifier.USER_IDENTIFIER:
-        ...
-
-    # If the callback data starts with the user identifier, handle it accordingly
-    elif obj_identifier == PayloadIdentifier.GROUP_IDENTIFIER:
-        if obj_name == ButtonAction.ADD:
-            awaiting_manager_mac[update.effective_chat.id] = int(obj_id)
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text="Please provide the MAC address of the manager to add."
-            )
-        else:
-            managers_response = await make_request(
-                method=Method.GET,
-                endpoint=Endpoint.GROUP_MANAGERS,
-                update=update,
-                json={JsonIdentifier.ID_KEY.value: obj_id}
-            )
-
-            if await reply_if_error(managers_response, update, context):
-                return
-
-            await send_menu_for_group(
-                update=update,
-                context=context,
-                group_id=obj_id,
-                group_name=obj_name,
-                managers_list=managers_response.json()
-            )
-
-    # If the callback data starts with the manager identifier, handle it accordingly
-    elif obj_identifier == PayloadIdentifier.MANAGER_IDENTIFIER:
-        if obj_name == ButtonAction.DAY:
-            await send_data_for_period(
-                update=update,
-                context=context,
-                module_id=obj_id,
-                identifier=PayloadIdentifier.MANAGER_IDENTIFIER
-            )
-        elif obj_name == ButtonAction.SELECT:
-            # TODO: Implement select data functionality
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=query.data
-            )
-        elif obj_name == ButtonAction.LAST:
-            await send_last_entry_data(
-                update=update,
-                context=context,
-                module_id=obj_id,
-                identifier=PayloadIdentifier.MANAGER_IDENTIFIER
-            )
-        elif obj_name == ButtonAction.ADD:
-            awaiting_worker_mac[update.effective_chat.id] = int(obj_id)
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text="Please provide the MAC address of the worker to add."
-            )
-        elif obj_name == ButtonAction.DELETE:
-            response = await make_request(
-                method=Method.DELETE,
-                endpoint=Endpoint.MANAGER,
-                update=update,
-                json={JsonIdentifier.ID_KEY.value: obj_id}
-            )
-
-            if await reply_if_error(response, update, context):
-                return
-
-            if response.is_success:
-                await context.bot.send_message(
-                    chat_id=update.effective_chat.id,
-                    text=f"Manager with ID {obj_id} deleted successfully."
-                )
-        else:
-            manager_response = await make_request(
-                method=Method.GET,
-                endpoint=Endpoint.MANAGER,
-                update=update,
-                json={JsonIdentifier.ID_KEY.value: obj_id}
-            )
-
-            workers_response = await make_request(
-                method=Method.GET,
-                endpoint=Endpoint.MANAGER_WORKERS,
-                update=update,
-                json={JsonIdentifier.ID_KEY.value: obj_id}
-            )
-
-            if await reply_if_error(workers_response, update, context):
-                return
-
-            await send_menu_for_manager(
-                update=update,
-                context=context,
-                workers_list=workers_response.json(),
-                manager_response=manager_response.json()
-            )
-
-    # If the callback data starts with the worker identifier, handle it accordingly
-    elif obj_identifier == PayloadIdentifier.WORKER_IDENTIFIER:
-        if obj_name == ButtonAction.DAY:
-            await send_data_for_period(
-                update=update,
-                context=context,
-                module_id=obj_id,
-                identifier=PayloadIdentifier.WORKER_IDENTIFIER
-            )
-        elif obj_name == ButtonAction.SELECT:
-            # TODO: Implement select data functionality
-            await context.bot.send_message(
-                chat_id=update.effective_chat.id,
-                text=query.data
-            )
-        elif obj_name == ButtonAction.LAST:
-            await send_last_entry_data(
-                update=update,
-                context=context,
-                module_id=obj_id,
-                identifier=PayloadIdentifier.WORKER_IDENTIFIER
-            )
-        elif obj_name == ButtonAction.DELETE:
-            response = await make_request(
-                method=Method.DELETE,
-                endpoint=Endpoint.WORKER,
-                update=update,
-                json={JsonIdentifier.ID_KEY.value: obj_id}
-            )
-
-            if await reply_if_error(response, update, context):
-                return
-
-            if response.is_success:
-                await context.bot.send_message(
-                    chat_id=update.effective_chat.id,
-                    text=f"Worker with ID {obj_id} deleted successfully."
-                )
-        else:
-            worker_response = await make_request(
-                method=Method.GET,
-                endpoint=Endpoint.WORKER,
-                update=update,
-                json={JsonIdentifier.ID_KEY.value: obj_id}
-            )
-
-            if await reply_if_error(worker_response, update, context):
-                return
-
-            await send_menu_for_worker(
-                update=update,
-                context=context,
-                worker_response=worker_response.json()
-            )
+
+    try:
+        obj_identifier, obj_id, obj_name = split_payload(query.data)
+    except ValueError:
+        await query.answer()
+        # Tokens that left the payload table, and data the current format cannot read
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="This button has expired, please open the menu again."
+        )
+        return
+
+    is_action = isinstance(obj_name, ButtonAction)
+    await callback_router.dispatch(CallbackRequest(
+        update=update,
+        context=context,
+        identifier=obj_identifier,
+        obj_id=obj_id,
+        action=obj_name if is_action else None,
+        name=None if is_action else obj_name
+    ))
@@ -0,0 +1,161 @@
+import datetime
+from asyncio import Future, get_running_loop, shield
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from config import CHART_WORKERS, CHART_CACHE_SIZE, CHART_CACHE_BUCKET, CHART_POINTS
+from enums.PayloadIdentifier import PayloadIdentifier
+from service.telegram.error_handlers import TempTakeError, raise_for_errors
+from service.temptake.loaders import load_module
+from service.temptake.series import series_cache
+from util.chart import render_chart, color_name
+from util.statistics import to_columns, lttb
+
+
+class ChartKey(NamedTuple):
+    module_id: str
+    identifier: str
+    bucket: int
+
+
+class ChartImage(NamedTuple):
+    png: bytes
+    caption: str
+    file_id: str | None = None
+
+
+# LRU cache of rendered charts, remembers the Telegram file_id once uploaded
+class ChartCache:
+    def __init__(self, max_size: int = CHART_CACHE_SIZE):
+        self.max_size = max_size
+        self._images: OrderedDict[ChartKey, ChartImage] = OrderedDict()
+
+    def get(self, key: ChartKey) -> ChartImage | None:
+        image = self._images.get(key)
+        if image is not None:
+            self._images.move_to_end(key)
+        return image
+
+    def put(self, key: ChartKey, image: ChartImage) -> None:
+        self._images[key] = image
+        self._images.move_to_end(key)
+        while len(self._images) > self.max_size:
+            self._images.popitem(last=False)
+
+
+chart_cache = ChartCache()
+
+# Renders in progress, so concurrent clicks on the same chart share one render
+_pending: dict[ChartKey, Future] = {}
+
+_pool: ProcessPoolExecutor | None = None
+
+
+def get_chart_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=CHART_WORKERS)
+    return _pool
+
+
+# Application post_shutdown hook
+async def shutdown_chart_pool(*_) -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+# Entry timestamps are UTC, so is the window
+def get_chart_window(now: datetime.datetime) -> tuple[int, datetime.datetime, datetime.datetime]:
+    bucket = int(now.timestamp()) // CHART_CACHE_BUCKET * CHART_CACHE_BUCKET
+    end = datetime.datetime.fromtimestamp(bucket, datetime.timezone.utc)
+    return bucket, end - datetime.timedelta(days=1), end
+
+
+async def render_chart_image(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    identifier: PayloadIdentifier,
+    module_id: str,
+    start: datetime.datetime,
+    end: datetime.datetime
+) -> ChartImage:
+    entries = await series_cache.query(update, identifier, int(module_id), start, end)
+
+    timestamps, columns = to_columns(entries)
+    series = {
+        key: lttb(
+            sorted((timestamp, value) for timestamp, value in zip(timestamps, column) if value == value),
+            CHART_POINTS
+        )
+        for key, column in columns.items()
+    }
+
+    png = await get_running_loop().run_in_executor(
+        get_chart_pool(), render_chart, series, start.timestamp(), end.timestamp()
+    )
+
+    caption = f"{start.isoformat(timespec='minutes')} to {end.isoformat(timespec='minutes')}"
+    for index, (key, points) in enumerate(series.items()):
+        if points:
+            values = [value for _, value in points]
+            caption += f"\n{key} ({color_name(index)}): {min(values):.1f} to {max(values):.1f}"
+
+    return ChartImage(png=png, caption=caption)
+
+
+async def send_chart_for_period(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    identifier: PayloadIdentifier,
+    module_id: str
+):
+    # The chart is shared between users, so check this user can see the module (cached per user)
+    raise_for_errors(await load_module(update, identifier, module_id))
+
+    bucket, start, end = get_chart_window(datetime.datetime.now(datetime.timezone.utc))
+    key = ChartKey(module_id, identifier.value, bucket)
+
+    image = chart_cache.get(key)
+    if image is None:
+        pending = _pending.get(key)
+        if pending is None:
+            pending = get_running_loop().create_future()
+            _pending[key] = pending
+            try:
+                image = await render_chart_image(update, context, identifier, module_id, start, end)
+                chart_cache.put(key, image)
+            except TempTakeError as error:
+                # Every waiting click gets the error reply
+                pending.set_exception(error)
+                pending.exception()
+                raise
+            finally:
+                _pending.pop(key, None)
+                # A failed or cancelled render leaves None, so the waiting clicks do not wait forever
+                if not pending.done():
+                    pending.set_result(image)
+        else:
+            # One click giving up must not cancel the render the others wait for
+            image = await shield(pending)
+
+        if image is None:
+            await context.bot.send_message(
+                chat_id=update.effective_chat.id,
+                text="The chart could not be rendered, please try again later."
+            )
+            return
+
+    message = await context.bot.send_photo(
+        chat_id=update.effective_chat.id,
+        photo=image.file_id or image.png,
+        caption=image.caption
+    )
+
+    if image.file_id is None and message.photo:
+        chart_cache.put(key, image._replace(file_id=message.photo[-1].file_id))
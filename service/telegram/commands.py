@@ -10,12 +10,14 @@ from enums.PayloadIdentifier import *
 
 from service.telegram.KeyboardBuilder import KeyboardBuilder
 from service.telegram.buttons import add_module_rows
+from service.metrics import timed_handler
 from service.telegram.error_handlers import reply_if_error
 from service.temptake.requests import make_request
 from util.security import get_user_credentials
 
 
 # Register a new user
+@timed_handler("start")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     response = await make_request(
         method=Method.POST,
@@ -36,6 +38,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
 
 
 # Add a manager to the user's group
+@timed_handler("add_manager")
 async def add_manager(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     group_response = await make_request(
         method=Method.GET,
@@ -69,6 +72,7 @@ async def add_manager(update: Update, context: ContextTypes.DEFAULT_TYPE) -> Non
 
 
 # Get the groups the user is a member of
+@timed_handler("get_user_groups")
 async def get_user_groups(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     response = await make_request(
         method=Method.GET,
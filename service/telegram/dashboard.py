@@ -0,0 +1,159 @@
+from asyncio import Semaphore, gather
+from typing import Any, Callable
+
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
+
+from config import DASHBOARD_CONCURRENCY, DASHBOARD_MAX_LENGTH
+from enums.Endpoint import Endpoint
+from enums.JsonIdentifier import JsonIdentifier
+from enums.Method import Method
+from enums.PayloadIdentifier import PayloadIdentifier
+from service.alerts.poller import LAST_ENTRY_ENDPOINTS, latest_entry
+from service.telegram.error_handlers import raise_for_errors
+from service.telegram.render import LiveMessage
+from service.temptake.latest import latest_entries
+from service.temptake.requests import make_request
+from util.statistics import get_entry_timestamp, is_metric
+
+
+# One line of the dashboard, filled in when the module's last entry arrives
+class ModuleStatus:
+    def __init__(self, identifier: PayloadIdentifier, module: dict[str, Any]):
+        self.identifier = identifier
+        self.module_id = module[JsonIdentifier.ID_KEY.value]
+        self.mac = module.get(JsonIdentifier.MAC_KEY.value, str(self.module_id))
+        self.entry: dict[str, Any] | None = None
+        self.error: str | None = None
+        self.loaded = False
+        self.workers: list["ModuleStatus"] = []
+        self.workers_error: str | None = None
+
+    def render(self, indent: str) -> str:
+        line = self.render_entry(indent)
+        if self.workers_error is not None:
+            line += f"  workers: {self.workers_error}"
+        return line
+
+    def render_entry(self, indent: str) -> str:
+        kind = "M" if self.identifier == PayloadIdentifier.MANAGER_IDENTIFIER else "W"
+        line = f"{indent}{kind} {self.mac}"
+        if not self.loaded:
+            return f"{line}  ..."
+        if self.error is not None:
+            return f"{line}  {self.error}"
+        if self.entry is None:
+            return f"{line}  no entries"
+
+        timestamp = get_entry_timestamp(self.entry)
+        when = timestamp.strftime("%m-%d %H:%M") if timestamp is not None else "?"
+        metrics = " ".join(f"{key} {value:g}" for key, value in self.entry.items() if is_metric(key, value))
+        return f"{line}  {when}  {metrics}"
+
+
+class Dashboard:
+    def __init__(self, title: str, managers: list[dict[str, Any]]):
+        self.title = title
+        self.managers = [ModuleStatus(PayloadIdentifier.MANAGER_IDENTIFIER, manager) for manager in managers]
+
+    # Managers followed by their workers, with the indent of each line
+    def rows(self) -> list[tuple[ModuleStatus, str]]:
+        return [
+            (module, "  " if module is not manager else "")
+            for manager in self.managers
+            for module in (manager, *manager.workers)
+        ]
+
+    # Lines that no longer fit into one message are summarized in the last line
+    def render(self, finished: bool) -> str:
+        rows = self.rows()
+        loaded = sum(module.loaded for module, _ in rows)
+        title = self.title if finished else f"{self.title} ({loaded}/{len(rows)} loaded)"
+
+        lines = []
+        length = len(title)
+        for index, (module, indent) in enumerate(rows):
+            line = module.render(indent)
+            if length + len(line) + 1 > DASHBOARD_MAX_LENGTH:
+                lines.append(f"... {len(rows) - index} more modules")
+                break
+            lines.append(line)
+            length += len(line) + 1
+
+        if not lines:
+            lines.append("No managers in this group.")
+
+        body = escape_markdown("\n".join(lines), version=2, entity_type="pre")
+        return f"{escape_markdown(title, version=2)}\n```\n{body}\n```"
+
+
+async def load_last_entry(
+    update: Update, module: ModuleStatus, semaphore: Semaphore, changed: Callable[[], None]
+) -> None:
+    # Entries pushed by the TempTake server are already known
+    pushed_entry = latest_entries.get(module.identifier.value, module.module_id)
+    if pushed_entry is not None:
+        module.entry = pushed_entry
+    else:
+        async with semaphore:
+            response = await make_request(
+                method=Method.GET,
+                endpoint=LAST_ENTRY_ENDPOINTS[module.identifier.value],
+                update=update,
+                json={JsonIdentifier.ID_KEY.value: module.module_id}
+            )
+        if response.is_success:
+            module.entry = latest_entry(response.json())
+        elif response.status_code != 404:
+            module.error = f"error {response.status_code}"
+
+    module.loaded = True
+    changed()
+
+
+async def load_manager(
+    update: Update, manager: ModuleStatus, semaphore: Semaphore, changed: Callable[[], None]
+) -> None:
+    async def load_workers() -> None:
+        async with semaphore:
+            response = await make_request(
+                method=Method.GET,
+                endpoint=Endpoint.MANAGER_WORKERS,
+                update=update,
+                json={JsonIdentifier.ID_KEY.value: manager.module_id}
+            )
+        if not response.is_success:
+            manager.workers_error = f"error {response.status_code}"
+            changed()
+            return
+
+        manager.workers = [ModuleStatus(PayloadIdentifier.WORKER_IDENTIFIER, worker) for worker in response.json()]
+        changed()
+        await gather(*(load_last_entry(update, worker, semaphore, changed) for worker in manager.workers))
+
+    await gather(load_last_entry(update, manager, semaphore, changed), load_workers())
+
+
+# Last entry of every manager and worker of a group in one message, filled in as the entries arrive
+async def send_dashboard_for_group(update: Update, context: ContextTypes.DEFAULT_TYPE, group_id: str) -> None:
+    managers_response = await make_request(
+        method=Method.GET,
+        endpoint=Endpoint.GROUP_MANAGERS,
+        update=update,
+        json={JsonIdentifier.ID_KEY.value: group_id}
+    )
+
+    raise_for_errors(managers_response)
+
+    dashboard = Dashboard(f"Group {group_id} dashboard", managers_response.json())
+    live_message = LiveMessage(context, update.effective_chat.id, dashboard.render, parse_mode="MarkdownV2")
+    await live_message.start()
+
+    semaphore = Semaphore(DASHBOARD_CONCURRENCY)
+    try:
+        await gather(*(
+            load_manager(update, manager, semaphore, live_message.changed) for manager in dashboard.managers
+        ))
+    finally:
+        await live_message.finish()
@@ -0,0 +1,294 @@
+from asyncio import Event, Future, Task, create_task, get_running_loop, shield, sleep, wait_for
+from bisect import insort
+from itertools import count
+from logging import getLogger
+from time import monotonic, perf_counter
+from typing import Any, Callable, Coroutine, Hashable, TypedDict
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import (
+    SEND_GLOBAL_RATE,
+    SEND_GLOBAL_BURST,
+    SEND_CHAT_RATE,
+    SEND_GROUP_CHAT_RATE,
+    SEND_CHAT_BURST,
+    SEND_MAX_RETRIES,
+)
+from enums.SendPriority import SendPriority
+from service.metrics import telegram_request_seconds
+
+
+logger = getLogger(__name__)
+
+# Bot API methods that count against Telegram's flood limits
+LIMITED_ENDPOINTS = {
+    "sendMessage",
+    "sendPhoto",
+    "sendDocument",
+    "sendMediaGroup",
+    "editMessageText",
+    "editMessageReplyMarkup",
+    "editMessageMedia",
+    "editMessageCaption",
+}
+
+
+class SendArgs(TypedDict, total=False):
+    priority: SendPriority
+    # Waiting requests to the same chat with the same key are replaced by the newest one
+    coalesce: Hashable
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    # Seconds until a token is available, 0 if one is available now
+    def wait_time(self, now: float) -> float:
+        self.refill(now)
+        if self.blocked_until > now:
+            return self.blocked_until - now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+    def is_idle(self, now: float) -> bool:
+        self.refill(now)
+        return self.tokens >= self.capacity and self.blocked_until <= now
+
+
+class Ticket:
+    def __init__(self, chat_id: int | str | None, priority: int, sequence: int, coalesce: Hashable | None):
+        self.chat_id = chat_id
+        self.priority = priority
+        self.sequence = sequence
+        self.coalesce = coalesce
+        self.granted: Future = get_running_loop().create_future()
+        self.result: Future = get_running_loop().create_future()
+
+    def __lt__(self, other: 'Ticket') -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+
+# Settle a replaced request with the outcome of the request that replaced it
+def copy_result(source: Future, target: Future) -> None:
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+        target.exception()
+    else:
+        target.set_result(source.result())
+
+
+# Rate limiter for every Bot API call, with per-chat and global token buckets, priorities and coalescing
+class OutboundDispatcher(BaseRateLimiter[SendArgs]):
+    def __init__(
+        self,
+        global_rate: float = SEND_GLOBAL_RATE,
+        global_burst: int = SEND_GLOBAL_BURST,
+        chat_rate: float = SEND_CHAT_RATE,
+        group_chat_rate: float = SEND_GROUP_CHAT_RATE,
+        chat_burst: int = SEND_CHAT_BURST,
+        max_retries: int = SEND_MAX_RETRIES
+    ):
+        self.chat_rate = chat_rate
+        self.group_chat_rate = group_chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.coalesced = 0
+        self.retried = 0
+        self._global_bucket = TokenBucket(global_rate, global_burst)
+        self._chat_buckets: dict[int | str, TokenBucket] = {}
+        self._waiting: list[Ticket] = []
+        self._sequence = count()
+        self._wakeup = Event()
+        self._scheduler: Task | None = None
+
+    async def initialize(self) -> None:
+        if self._scheduler is None:
+            self._scheduler = create_task(self._schedule())
+
+    async def shutdown(self) -> None:
+        if self._scheduler is not None:
+            self._scheduler.cancel()
+            self._scheduler = None
+        for ticket in self._waiting:
+            ticket.granted.cancel()
+        self._waiting.clear()
+
+    def _chat_bucket(self, chat_id: int | str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # Negative ids and @usernames are groups and channels, which have a lower limit
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            bucket = TokenBucket(self.group_chat_rate if is_group else self.chat_rate, self.chat_burst)
+            self._chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune_buckets(self, now: float) -> None:
+        if len(self._chat_buckets) < 1024:
+            return
+        waiting = {ticket.chat_id for ticket in self._waiting}
+        for chat_id in [chat_id for chat_id, bucket in self._chat_buckets.items() if bucket.is_idle(now)]:
+            if chat_id not in waiting:
+                del self._chat_buckets[chat_id]
+
+    # Grant tokens to waiting requests in priority order, as the buckets allow
+    async def _schedule(self) -> None:
+        while True:
+            now = monotonic()
+            delay = None
+
+            global_wait = self._global_bucket.wait_time(now)
+            if global_wait:
+                delay = global_wait
+            else:
+                for ticket in self._waiting:
+                    chat_wait = 0.0 if ticket.chat_id is None else self._chat_bucket(ticket.chat_id).wait_time(now)
+                    if chat_wait:
+                        delay = chat_wait if delay is None else min(delay, chat_wait)
+                        continue
+
+                    self._waiting.remove(ticket)
+                    self._global_bucket.take()
+                    if ticket.chat_id is not None:
+                        self._chat_bucket(ticket.chat_id).take()
+                    if not ticket.granted.done():
+                        ticket.granted.set_result(None)
+                    delay = 0.0
+                    break
+
+            self._prune_buckets(now)
+
+            if delay == 0.0:
+                await sleep(0)
+                continue
+
+            self._wakeup.clear()
+            if not self._waiting:
+                await self._wakeup.wait()
+            else:
+                try:
+                    await wait_for(self._wakeup.wait(), delay)
+                except TimeoutError:
+                    pass
+
+    def _enqueue(self, ticket: Ticket) -> Ticket | None:
+        superseded = None
+        if ticket.coalesce is not None:
+            for waiting in self._waiting:
+                if waiting.chat_id == ticket.chat_id and waiting.coalesce == ticket.coalesce:
+                    superseded = waiting
+                    break
+
+        if superseded is not None:
+            self._waiting.remove(superseded)
+            # The newest request keeps the place in line of the one it replaces
+            ticket.priority = min(ticket.priority, superseded.priority)
+            ticket.sequence = superseded.sequence
+            self.coalesced += 1
+
+        insort(self._waiting, ticket)
+        self._wakeup.set()
+        return superseded
+
+    def _block(self, chat_id: int | str | None, seconds: float) -> None:
+        bucket = self._global_bucket if chat_id is None else self._chat_bucket(chat_id)
+        bucket.blocked_until = max(bucket.blocked_until, monotonic() + seconds)
+        self._wakeup.set()
+
+    @staticmethod
+    async def _call(endpoint: str, callback: Callable[..., Coroutine], args: Any, kwargs: dict[str, Any]) -> Any:
+        started = perf_counter()
+        try:
+            return await callback(*args, **kwargs)
+        finally:
+            telegram_request_seconds.observe(perf_counter() - started, endpoint)
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, bool | dict[str, Any] | list[dict[str, Any]]]],
+        args: Any,
+        kwargs: dict[str, Any],
+        endpoint: str,
+        data: dict[str, Any],
+        rate_limit_args: SendArgs | None,
+    ) -> bool | dict[str, Any] | list[dict[str, Any]]:
+        if endpoint not in LIMITED_ENDPOINTS or self._scheduler is None:
+            return await self._call(endpoint, callback, args, kwargs)
+
+        rate_limit_args = rate_limit_args or {}
+        ticket = Ticket(
+            chat_id=data.get("chat_id"),
+            priority=rate_limit_args.get("priority", SendPriority.INTERACTIVE),
+            sequence=next(self._sequence),
+            coalesce=rate_limit_args.get("coalesce")
+        )
+
+        superseded = self._enqueue(ticket)
+        if superseded is not None:
+            superseded.granted.set_result(ticket)
+
+        attempt = 0
+        chained = False
+        try:
+            while True:
+                replacement = await ticket.granted
+                if replacement is not None:
+                    # Requests replaced by this one wait on its result, so it must be settled as well
+                    replacement.result.add_done_callback(lambda source: copy_result(source, ticket.result))
+                    chained = True
+                    return await shield(ticket.result)
+
+                try:
+                    result = await self._call(endpoint, callback, args, kwargs)
+                except RetryAfter as error:
+                    if attempt >= self.max_retries:
+                        ticket.result.set_exception(error)
+                        ticket.result.exception()
+                        raise
+                    attempt += 1
+                    self.retried += 1
+                    logger.warning("Flood limit for chat %s, retrying in %ss", ticket.chat_id, error.retry_after)
+                    self._block(ticket.chat_id, error.retry_after)
+                    ticket.granted = get_running_loop().create_future()
+                    insort(self._waiting, ticket)
+                    self._wakeup.set()
+                    continue
+                except Exception as error:
+                    ticket.result.set_exception(error)
+                    ticket.result.exception()
+                    raise
+
+                ticket.result.set_result(result)
+                return result
+        finally:
+            # A request cancelled before it finished must not leave the requests it replaced waiting forever
+            if not chained and not ticket.result.done():
+                ticket.result.cancel()
+                if ticket in self._waiting:
+                    self._waiting.remove(ticket)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "waiting": len(self._waiting),
+            "chats": len(self._chat_buckets),
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+        }
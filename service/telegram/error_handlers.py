@@ -11,3 +11,32 @@ async def reply_if_error(response: Response, update: Update, context: ContextTyp
         )
         return True
     return False
+
+
+# Reply once for all failed responses of a composite request
+async def reply_if_any_error(responses: list[Response], update: Update, context: ContextTypes.DEFAULT_TYPE) -> bool:
+    failed = [response for response in responses if not response.is_success]
+    if not failed:
+        return False
+
+    if len(failed) == 1:
+        return await reply_if_error(failed[0], update, context)
+
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        text="\n".join(f"Error {response.status_code}.\n{response.text}" for response in failed)
+    )
+    return True
+
+
+# Raised instead of replying by hand, the router's error middleware replies once for all failures
+class TempTakeError(Exception):
+    def __init__(self, *responses: Response):
+        super().__init__(", ".join(str(response.status_code) for response in responses))
+        self.responses = list(responses)
+
+
+def raise_for_errors(*responses: Response) -> None:
+    failed = [response for response in responses if not response.is_success]
+    if failed:
+        raise TempTakeError(*failed)
@@ -0,0 +1,189 @@
+import datetime
+from asyncio import Task, create_task, gather, to_thread
+from csv import DictWriter
+from gzip import GzipFile
+from io import TextIOWrapper
+from logging import getLogger
+from tempfile import TemporaryFile
+from typing import Any, AsyncIterator, BinaryIO, NamedTuple
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from config import EXPORT_DAYS, EXPORT_BATCH_SIZE, EXPORT_MAX_BYTES
+from enums.JsonIdentifier import JsonIdentifier
+from enums.Method import Method
+from enums.PayloadIdentifier import PayloadIdentifier
+from enums.SendPriority import SendPriority
+from service.telegram.error_handlers import raise_for_errors, reply_if_error
+from service.temptake.loaders import load_module
+from service.temptake.requests import stream_request
+from service.temptake.series import ENTRY_ENDPOINTS, to_epoch, to_iso
+from util.json_stream import iter_json_array
+
+
+logger = getLogger(__name__)
+
+# Exports in progress, at most one per chat
+_exports: dict[int, Task] = {}
+
+
+class ExportTooLargeError(Exception):
+    pass
+
+
+class CsvExport(NamedTuple):
+    count: int
+    # Fields that first appeared after the header was written, their values are not in the file
+    skipped_fields: list[str]
+
+
+async def batched(items: AsyncIterator[Any], size: int) -> AsyncIterator[list[Any]]:
+    batch = []
+    async for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# The columns are the fields of the first batch. The entries are streamed, so the header is written before
+# later entries are seen. Fields first appearing after it are left out on purpose and reported,
+# and fields an entry lacks are left empty. Compression and file writes run in a thread, one batch at a time.
+# Raises ExportTooLargeError as soon as the file grows past max_bytes.
+async def write_gzip_csv(
+    entries: AsyncIterator[dict[str, Any]], file: BinaryIO, max_bytes: int = EXPORT_MAX_BYTES
+) -> CsvExport:
+    count = 0
+    skipped_fields: dict[str, None] = {}
+    with GzipFile(fileobj=file, mode="wb") as compressed, TextIOWrapper(compressed, encoding="utf-8", newline="") as text:
+        writer = None
+        async for batch in batched(entries, EXPORT_BATCH_SIZE):
+            if writer is None:
+                fieldnames = list(dict.fromkeys(key for entry in batch for key in entry))
+                writer = DictWriter(text, fieldnames=fieldnames, extrasaction="ignore", restval="")
+                await to_thread(writer.writeheader)
+            else:
+                skipped_fields.update(dict.fromkeys(
+                    key for entry in batch for key in entry if key not in writer.fieldnames
+                ))
+            await to_thread(writer.writerows, batch)
+            count += len(batch)
+
+            if file.tell() > max_bytes:
+                raise ExportTooLargeError(file.tell())
+
+    if file.tell() > max_bytes:
+        raise ExportTooLargeError(file.tell())
+    return CsvExport(count, list(skipped_fields))
+
+
+def get_export_filename(identifier: PayloadIdentifier, module_id: str, start: datetime.datetime, end: datetime.datetime) -> str:
+    module_name = identifier.name.split("_")[0].lower()
+    return f"{module_name}-{module_id}-{start:%Y%m%d}-{end:%Y%m%d}.csv.gz"
+
+
+async def run_export(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    identifier: PayloadIdentifier,
+    module_id: str,
+    start: datetime.datetime,
+    end: datetime.datetime
+) -> None:
+    chat_id = update.effective_chat.id
+
+    # The file is spooled to disk, so memory use does not grow with the length of the period
+    with TemporaryFile() as spool:
+        async with stream_request(
+            method=Method.GET,
+            endpoint=ENTRY_ENDPOINTS[identifier],
+            update=update,
+            json={
+                JsonIdentifier.ID_KEY.value: int(module_id),
+                JsonIdentifier.START_TIMESTAMP_KEY.value: to_iso(to_epoch(start)),
+                JsonIdentifier.END_TIMESTAMP_KEY.value: to_iso(to_epoch(end))
+            }
+        ) as response:
+            if not response.is_success:
+                await response.aread()
+                await reply_if_error(response, update, context)
+                return
+
+            try:
+                export = await write_gzip_csv(iter_json_array(response.aiter_bytes()), spool)
+            except ExportTooLargeError:
+                await context.bot.send_message(
+                    chat_id=chat_id,
+                    text="The export is larger than Telegram allows, lower EXPORT_DAYS to export a shorter period."
+                )
+                return
+
+        if not export.count:
+            await context.bot.send_message(chat_id=chat_id, text="No entries to export for this period.")
+            return
+
+        caption = f"{export.count} entries from {to_iso(to_epoch(start))} to {to_iso(to_epoch(end))} UTC"
+        if export.skipped_fields:
+            caption += f"\nLeft out fields missing from the first entries: {', '.join(export.skipped_fields)[:200]}"
+
+        spool.seek(0)
+        await context.bot.send_document(
+            chat_id=chat_id,
+            document=spool,
+            filename=get_export_filename(identifier, module_id, start, end),
+            caption=caption,
+            rate_limit_args={"priority": SendPriority.BULK}
+        )
+
+
+async def export_in_background(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    identifier: PayloadIdentifier,
+    module_id: str,
+    start: datetime.datetime,
+    end: datetime.datetime
+) -> None:
+    chat_id = update.effective_chat.id
+    try:
+        await run_export(update, context, identifier, module_id, start, end)
+    except Exception:
+        logger.exception("Export of %s %s failed", identifier.name, module_id)
+        await context.bot.send_message(chat_id=chat_id, text="The export failed, please try again later.")
+    finally:
+        _exports.pop(chat_id, None)
+
+
+# Starts the export and returns right away, the document is sent when it is ready
+async def send_export_for_period(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    identifier: PayloadIdentifier,
+    module_id: str
+) -> None:
+    raise_for_errors(await load_module(update, identifier, module_id))
+
+    chat_id = update.effective_chat.id
+    if chat_id in _exports:
+        await context.bot.send_message(chat_id=chat_id, text="An export is already running in this chat.")
+        return
+
+    end = datetime.datetime.now(datetime.timezone.utc)
+    start = end - datetime.timedelta(days=EXPORT_DAYS)
+    _exports[chat_id] = create_task(export_in_background(update, context, identifier, module_id, start, end))
+
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text=f"Exporting the last {EXPORT_DAYS} days, the file will be sent when it is ready."
+    )
+
+
+# Application post_shutdown hook
+async def cancel_exports(*_) -> None:
+    tasks = list(_exports.values())
+    for task in tasks:
+        task.cancel()
+    await gather(*tasks, return_exceptions=True)
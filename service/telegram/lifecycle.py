@@ -0,0 +1,34 @@
+from asyncio import Event, get_running_loop
+from contextlib import asynccontextmanager
+from signal import SIGINT, SIGTERM
+from typing import AsyncIterator
+
+from telegram.ext import Application
+
+
+# Set once SIGINT or SIGTERM is received
+def create_stop_event() -> Event:
+    stop_event = Event()
+    loop = get_running_loop()
+    for signal in (SIGINT, SIGTERM):
+        loop.add_signal_handler(signal, stop_event.set)
+    return stop_event
+
+
+# Initialize and start the application with its hooks, like run_polling, for loops that deliver updates themselves
+@asynccontextmanager
+async def running(application: Application) -> AsyncIterator[Application]:
+    await application.initialize()
+    if application.post_init:
+        await application.post_init(application)
+
+    await application.start()
+    try:
+        yield application
+    finally:
+        await application.stop()
+        if application.post_stop:
+            await application.post_stop(application)
+        await application.shutdown()
+        if application.post_shutdown:
+            await application.post_shutdown(application)
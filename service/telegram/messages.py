@@ -1,18 +1,42 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 
-from service.telegram.buttons import awaiting_worker_mac, awaiting_manager_mac
+from service.metrics import timed_handler
+from service.telegram.alerts import add_alert_from_message
+from service.telegram.provisioning import is_bulk, provision_modules
+from service.telegram.state import state_store
 from service.telegram.error_handlers import reply_if_error
 from service.temptake.requests import make_request
 from enums.JsonIdentifier import JsonIdentifier
 from enums.Endpoint import Endpoint
 from enums.Method import Method
+from enums.PendingAction import PendingAction
+from util.mac import normalize_mac
 
 
+# Single MACs are normalized like bulk ones, so a module added either way is the same device
+async def read_single_mac(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str | None:
+    mac = normalize_mac(update.message.text)
+    if mac is None:
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text=f"Not a MAC address: {update.message.text[:200]}"
+        )
+    return mac
+
+
+@timed_handler("message_handler")
 async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    group_id = awaiting_manager_mac.pop(update.effective_chat.id, None)
+    group_id = await state_store.pop(PendingAction.ADD_MANAGER, update.effective_chat.id)
     if group_id is not None:
-        manager_mac = update.message.text.upper()
+        if is_bulk(update.message):
+            await provision_modules(update, context, PendingAction.ADD_MANAGER, group_id)
+            return
+
+        manager_mac = await read_single_mac(update, context)
+        if manager_mac is None:
+            return
+
         manager = {
             JsonIdentifier.ID_KEY.value: group_id,
             JsonIdentifier.MAC_KEY.value: manager_mac,
@@ -34,9 +58,16 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
         )
         return
 
-    manager_id = awaiting_worker_mac.pop(update.effective_chat.id, None)
+    manager_id = await state_store.pop(PendingAction.ADD_WORKER, update.effective_chat.id)
     if manager_id is not None:
-        worker_mac = update.message.text.upper()
+        if is_bulk(update.message):
+            await provision_modules(update, context, PendingAction.ADD_WORKER, manager_id)
+            return
+
+        worker_mac = await read_single_mac(update, context)
+        if worker_mac is None:
+            return
+
         worker = {
             JsonIdentifier.ID_KEY.value: manager_id,
             JsonIdentifier.MAC_KEY.value: worker_mac,
@@ -57,3 +88,12 @@ async def message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) ->
             text=f"Worker {worker_mac} added successfully."
         )
         return
+
+    # Files are only read as lists of MACs
+    if update.message.text is None:
+        return
+
+    pending_alert = await state_store.pop(PendingAction.ADD_ALERT, update.effective_chat.id)
+    if pending_alert is not None:
+        await add_alert_from_message(update, context, pending_alert)
+        return
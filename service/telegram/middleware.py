@@ -0,0 +1,42 @@
+from time import perf_counter
+
+from config import ALLOWED_CHAT_IDS
+from service.metrics import handler_seconds
+from service.telegram.error_handlers import TempTakeError, reply_if_any_error
+from service.telegram.router import CallbackRequest, CallbackHandler
+from service.temptake.requests import request_scope
+
+
+async def timing_middleware(request: CallbackRequest, handler: CallbackHandler) -> None:
+    action = request.action.value if request.action is not None else "open"
+    started = perf_counter()
+    try:
+        await handler(request)
+    finally:
+        handler_seconds.observe(perf_counter() - started, "button_handler", request.identifier.name, action)
+
+
+async def error_middleware(request: CallbackRequest, handler: CallbackHandler) -> None:
+    try:
+        await handler(request)
+    except TempTakeError as error:
+        await reply_if_any_error(error.responses, request.update, request.context)
+
+
+async def auth_middleware(request: CallbackRequest, handler: CallbackHandler) -> None:
+    if ALLOWED_CHAT_IDS and request.update.effective_chat.id not in ALLOWED_CHAT_IDS:
+        await request.context.bot.send_message(
+            chat_id=request.update.effective_chat.id,
+            text="You are not allowed to use this bot."
+        )
+        return
+    await handler(request)
+
+
+# Identical TempTake GETs made while handling one click are sent once
+async def request_cache_middleware(request: CallbackRequest, handler: CallbackHandler) -> None:
+    token = request_scope.set({})
+    try:
+        await handler(request)
+    finally:
+        request_scope.reset(token)
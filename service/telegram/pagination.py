@@ -0,0 +1,140 @@
+from collections import OrderedDict
+from secrets import token_urlsafe
+from time import monotonic
+from typing import Iterable, NamedTuple
+
+from telegram import Update
+from telegram.ext import ContextTypes
+from telegram.helpers import escape_markdown
+
+from config import PAGE_SIZE, PAGE_STORE_SIZE, PAGE_STORE_TTL
+from enums.PayloadIdentifier import PayloadIdentifier
+from service.telegram.KeyboardBuilder import KeyboardBuilder
+from util.payload import create_payload
+
+
+class PagedResult(NamedTuple):
+    chat_id: int
+    title: str
+    language: str
+    pages: list[str]
+    expires_at: float
+
+
+# Bounded, expiring store of already fetched results, paging never goes back to TempTake
+class PageStore:
+    def __init__(self, max_size: int = PAGE_STORE_SIZE, ttl: float = PAGE_STORE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._results: OrderedDict[str, PagedResult] = OrderedDict()
+
+    def add(self, chat_id: int, title: str, language: str, pages: list[str]) -> str:
+        now = monotonic()
+        for token in [token for token, result in self._results.items() if result.expires_at <= now]:
+            del self._results[token]
+
+        token = token_urlsafe(6)
+        self._results[token] = PagedResult(chat_id, title, language, pages, now + self.ttl)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+        return token
+
+    def get(self, token: str, chat_id: int) -> PagedResult | None:
+        result = self._results.get(token)
+        if result is None or result.chat_id != chat_id or result.expires_at <= monotonic():
+            return None
+        self._results.move_to_end(token)
+        return result
+
+
+page_store = PageStore()
+
+
+# Pack chunks into pages of at most `limit` characters, splitting oversized chunks
+def split_pages(chunks: Iterable[str], limit: int = PAGE_SIZE) -> list[str]:
+    pages: list[str] = []
+    current = ""
+
+    for chunk in chunks:
+        while len(chunk) > limit:
+            if current:
+                pages.append(current)
+                current = ""
+            pages.append(chunk[:limit])
+            chunk = chunk[limit:]
+
+        if current and len(current) + 1 + len(chunk) > limit:
+            pages.append(current)
+            current = ""
+        current = f"{current}\n{chunk}" if current else chunk
+
+    if current or not pages:
+        pages.append(current)
+    return pages
+
+
+def render_page(result: PagedResult, page: int) -> str:
+    title = result.title if len(result.pages) == 1 else f"{result.title} ({page + 1}/{len(result.pages)})"
+    body = escape_markdown(result.pages[page], version=2, entity_type="pre")
+    return f"{escape_markdown(title, version=2)}\n```{result.language}\n{body}\n```"
+
+
+def build_page_keyboard(token: str, page: int, page_count: int) -> KeyboardBuilder | None:
+    if page_count <= 1:
+        return None
+
+    keyboard_builder = KeyboardBuilder()
+    if page > 0:
+        keyboard_builder.add_row_button(
+            text="< Prev",
+            callback_data=create_payload(PayloadIdentifier.PAGE_IDENTIFIER, token, str(page - 1))
+        )
+    if page < page_count - 1:
+        keyboard_builder.add_row_button(
+            text="Next >",
+            callback_data=create_payload(PayloadIdentifier.PAGE_IDENTIFIER, token, str(page + 1))
+        )
+    return keyboard_builder
+
+
+# Send the first page of a result, keeping the rest for the next/prev buttons
+async def send_paginated(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    title: str,
+    chunks: Iterable[str],
+    language: str = ""
+):
+    pages = split_pages(chunks)
+    token = page_store.add(update.effective_chat.id, title, language, pages)
+    result = page_store.get(token, update.effective_chat.id)
+    keyboard_builder = build_page_keyboard(token, 0, len(pages))
+
+    await context.bot.send_message(
+        chat_id=update.effective_chat.id,
+        parse_mode="MarkdownV2",
+        text=render_page(result, 0),
+        reply_markup=keyboard_builder.build() if keyboard_builder else None
+    )
+
+
+# Edit the paged message in place to show another page
+async def show_page(update: Update, context: ContextTypes.DEFAULT_TYPE, token: str, page: int):
+    result = page_store.get(token, update.effective_chat.id)
+    if result is None or not 0 <= page < len(result.pages):
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text="This result has expired, please request it again."
+        )
+        return
+
+    keyboard_builder = build_page_keyboard(token, page, len(result.pages))
+
+    await context.bot.edit_message_text(
+        chat_id=update.effective_chat.id,
+        message_id=update.callback_query.message.message_id,
+        parse_mode="MarkdownV2",
+        text=render_page(result, page),
+        reply_markup=keyboard_builder.build() if keyboard_builder else None,
+        rate_limit_args={"coalesce": update.callback_query.message.message_id}
+    )
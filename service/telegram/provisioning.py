@@ -0,0 +1,177 @@
+from asyncio import Semaphore, Task, create_task, gather
+from logging import getLogger
+
+from telegram import Message, Update
+from telegram.ext import ContextTypes
+
+from config import BULK_CONCURRENCY, BULK_MAX_MACS, BULK_MAX_FILE_SIZE, PAGE_SIZE
+from enums.Endpoint import Endpoint
+from enums.JsonIdentifier import JsonIdentifier
+from enums.Method import Method
+from enums.PendingAction import PendingAction
+from service.telegram.render import LiveMessage
+from service.temptake.requests import make_request
+from util.mac import MacList, extract_mac_tokens, parse_mac_list
+
+
+# The endpoint adding each kind of module, the module and the object it is added to
+PROVISION_TARGETS = {
+    PendingAction.ADD_MANAGER: (Endpoint.GROUP_MANAGER, "managers", "group"),
+    PendingAction.ADD_WORKER: (Endpoint.MANAGER_WORKER, "workers", "manager"),
+}
+
+PENDING = "..."
+ADDED = "added"
+
+logger = getLogger(__name__)
+
+# Bulk adds in progress, at most one per chat
+_provisionings: dict[int, Task] = {}
+
+
+# A file or more than one MAC, a single pasted MAC keeps the one by one flow
+def is_bulk(message: Message) -> bool:
+    return message.document is not None or (message.text is not None and len(extract_mac_tokens(message.text)) > 1)
+
+
+class Provisioning:
+    def __init__(self, title: str, macs: MacList):
+        self.title = title
+        self.macs = macs
+        self.results = dict.fromkeys(macs.valid, PENDING)
+
+    def render(self, finished: bool) -> str:
+        done = sum(result != PENDING for result in self.results.values())
+        if finished:
+            added = sum(result == ADDED for result in self.results.values())
+            title = f"{self.title}: {added} of {len(self.results)} added"
+        else:
+            title = f"{self.title} ({done}/{len(self.results)} done)"
+
+        lines = [title]
+        length = len(title)
+        for index, (mac, result) in enumerate(self.results.items()):
+            line = f"{mac} {result}"
+            if length + len(line) + 1 > PAGE_SIZE:
+                lines.append(f"... {len(self.results) - index} more")
+                break
+            lines.append(line)
+            length += len(line) + 1
+
+        if self.macs.invalid:
+            invalid = ", ".join(self.macs.invalid)
+            lines.append(f"Not a MAC address: {invalid[:200]}{'...' if len(invalid) > 200 else ''}")
+        if self.macs.duplicates:
+            lines.append(f"Skipped {self.macs.duplicates} duplicates")
+        return "\n".join(lines)
+
+
+async def read_message_text(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str | None:
+    document = update.message.document
+    if document is None:
+        return update.message.text
+
+    if document.file_size is not None and document.file_size > BULK_MAX_FILE_SIZE:
+        await context.bot.send_message(
+            chat_id=update.effective_chat.id,
+            text=f"The file is too large, at most {BULK_MAX_FILE_SIZE // 1024} KB are accepted."
+        )
+        return None
+
+    file = await context.bot.get_file(document.file_id)
+    content = await file.download_as_bytearray()
+    return bytes(content).decode("utf-8-sig", errors="replace")
+
+
+async def add_modules(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    action: PendingAction,
+    parent_id: int,
+    macs: MacList
+) -> None:
+    endpoint, module_name, parent_name = PROVISION_TARGETS[action]
+    provisioning = Provisioning(f"Adding {module_name} to {parent_name} {parent_id}", macs)
+    live_message = LiveMessage(context, update.effective_chat.id, provisioning.render)
+    await live_message.start()
+
+    semaphore = Semaphore(BULK_CONCURRENCY)
+
+    async def add_module(mac: str) -> None:
+        async with semaphore:
+            response = await make_request(
+                method=Method.POST,
+                endpoint=endpoint,
+                update=update,
+                json={
+                    JsonIdentifier.ID_KEY.value: parent_id,
+                    JsonIdentifier.MAC_KEY.value: mac,
+                }
+            )
+
+        if response.is_success:
+            provisioning.results[mac] = ADDED
+        else:
+            provisioning.results[mac] = f"error {response.status_code} {' '.join(response.text.split())[:60]}"
+        live_message.changed()
+
+    try:
+        await gather(*(add_module(mac) for mac in macs.valid))
+    finally:
+        await live_message.finish()
+
+
+async def add_modules_in_background(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    action: PendingAction,
+    parent_id: int,
+    macs: MacList
+) -> None:
+    chat_id = update.effective_chat.id
+    try:
+        await add_modules(update, context, action, parent_id, macs)
+    except Exception:
+        logger.exception("Bulk add to %s failed", parent_id)
+        await context.bot.send_message(chat_id=chat_id, text="The bulk add failed, please try again later.")
+    finally:
+        _provisionings.pop(chat_id, None)
+
+
+# Add every MAC of a pasted list or CSV file, reporting the result of each in one message.
+# The requests run in the background, so the chat's other updates are not held up behind them.
+async def provision_modules(
+    update: Update, context: ContextTypes.DEFAULT_TYPE, action: PendingAction, parent_id: int
+) -> None:
+    _, module_name, _ = PROVISION_TARGETS[action]
+    chat_id = update.effective_chat.id
+
+    if chat_id in _provisionings:
+        await context.bot.send_message(chat_id=chat_id, text="A bulk add is already running in this chat.")
+        return
+
+    text = await read_message_text(update, context)
+    if text is None:
+        return
+
+    macs = parse_mac_list(text)
+    if not macs.valid:
+        await context.bot.send_message(chat_id=chat_id, text="No valid MAC addresses found.")
+        return
+
+    if len(macs.valid) > BULK_MAX_MACS:
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text=f"At most {BULK_MAX_MACS} {module_name} can be added at once, {len(macs.valid)} were given."
+        )
+        return
+
+    _provisionings[chat_id] = create_task(add_modules_in_background(update, context, action, parent_id, macs))
+
+
+# Application post_shutdown hook
+async def cancel_provisionings(*_) -> None:
+    tasks = list(_provisionings.values())
+    for task in tasks:
+        task.cancel()
+    await gather(*tasks, return_exceptions=True)
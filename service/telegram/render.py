@@ -0,0 +1,183 @@
+from asyncio import Event, Task, create_task
+from collections import OrderedDict
+from hashlib import blake2b
+from logging import getLogger
+from typing import Callable, NamedTuple
+
+from telegram import Update, InlineKeyboardMarkup
+from telegram.error import BadRequest, TelegramError
+from telegram.ext import ContextTypes
+
+from config import MENU_RENDER_CACHE_SIZE
+
+
+logger = getLogger(__name__)
+
+class RenderDigest(NamedTuple):
+    text: bytes
+    markup: bytes
+
+
+def digest(value: str) -> bytes:
+    return blake2b(value.encode(), digest_size=16).digest()
+
+
+# Content hashes of the last render of each bot message, so unchanged parts are not re-sent
+class RenderCache:
+    def __init__(self, max_size: int = MENU_RENDER_CACHE_SIZE):
+        self.max_size = max_size
+        self.skipped = 0
+        self._digests: OrderedDict[tuple[int, int], RenderDigest] = OrderedDict()
+
+    @staticmethod
+    def render_digest(text: str, reply_markup: InlineKeyboardMarkup | None) -> RenderDigest:
+        return RenderDigest(digest(text), digest(reply_markup.to_json() if reply_markup is not None else ""))
+
+    def get(self, chat_id: int, message_id: int) -> RenderDigest | None:
+        current = self._digests.get((chat_id, message_id))
+        if current is not None:
+            self._digests.move_to_end((chat_id, message_id))
+        return current
+
+    def remember(self, chat_id: int, message_id: int, render_digest: RenderDigest) -> None:
+        self._digests[(chat_id, message_id)] = render_digest
+        self._digests.move_to_end((chat_id, message_id))
+        while len(self._digests) > self.max_size:
+            self._digests.popitem(last=False)
+
+
+render_cache = RenderCache()
+
+
+# Edit the message whose button was pressed, or send a new one when that is not possible
+async def send_or_edit_menu(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    text: str,
+    reply_markup: InlineKeyboardMarkup | None = None,
+    parse_mode: str | None = None
+):
+    chat_id = update.effective_chat.id
+    render_digest = RenderCache.render_digest(text, reply_markup)
+    query = update.callback_query
+    message = query.message if query is not None else None
+
+    if message is not None and getattr(message, "text", None) is not None:
+        previous = render_cache.get(chat_id, message.message_id)
+        if previous == render_digest:
+            render_cache.skipped += 1
+            return
+
+        try:
+            if previous is not None and previous.text == render_digest.text:
+                await context.bot.edit_message_reply_markup(
+                    chat_id=chat_id,
+                    message_id=message.message_id,
+                    reply_markup=reply_markup,
+                    rate_limit_args={"coalesce": message.message_id}
+                )
+            else:
+                await context.bot.edit_message_text(
+                    chat_id=chat_id,
+                    message_id=message.message_id,
+                    text=text,
+                    parse_mode=parse_mode,
+                    reply_markup=reply_markup,
+                    rate_limit_args={"coalesce": message.message_id}
+                )
+            render_cache.remember(chat_id, message.message_id, render_digest)
+            return
+        except BadRequest as error:
+            if "not modified" in error.message:
+                render_cache.remember(chat_id, message.message_id, render_digest)
+                return
+
+    sent = await context.bot.send_message(
+        chat_id=chat_id,
+        text=text,
+        parse_mode=parse_mode,
+        reply_markup=reply_markup
+    )
+    render_cache.remember(chat_id, sent.message_id, render_digest)
+
+
+# A message re-rendered while a long running task fills it in, edits still waiting are coalesced by the dispatcher.
+# render is called with whether the task finished. A failed edit is logged and retried with the next change,
+# the task's work is not failed because its progress message could not be updated.
+class LiveMessage:
+    def __init__(
+        self,
+        context: ContextTypes.DEFAULT_TYPE,
+        chat_id: int,
+        render: Callable[[bool], str],
+        parse_mode: str | None = None
+    ):
+        self.context = context
+        self.chat_id = chat_id
+        self.render = render
+        self.parse_mode = parse_mode
+        self.message_id: int | None = None
+        self._last_text: str | None = None
+        self._changed = Event()
+        self._finished = False
+        self._publisher: Task | None = None
+
+    async def start(self) -> None:
+        self._last_text = self.render(False)
+        message = await self.context.bot.send_message(
+            chat_id=self.chat_id,
+            text=self._last_text,
+            parse_mode=self.parse_mode
+        )
+        self.message_id = message.message_id
+        self._publisher = create_task(self._publish())
+
+    def changed(self) -> None:
+        self._changed.set()
+
+    async def _edit(self, text: str) -> None:
+        try:
+            await self.context.bot.edit_message_text(
+                chat_id=self.chat_id,
+                message_id=self.message_id,
+                text=text,
+                parse_mode=self.parse_mode,
+                rate_limit_args={"coalesce": self.message_id}
+            )
+        except BadRequest as error:
+            if "not modified" not in error.message:
+                logger.warning("Could not update message %s in chat %s: %s", self.message_id, self.chat_id, error)
+                return
+        except TelegramError as error:
+            logger.warning("Could not update message %s in chat %s: %s", self.message_id, self.chat_id, error)
+            return
+        self._last_text = text
+
+    async def _publish(self) -> None:
+        while True:
+            await self._changed.wait()
+            self._changed.clear()
+            finished = self._finished
+
+            text = self.render(finished)
+            if text != self._last_text:
+                await self._edit(text)
+
+            if finished:
+                return
+
+    # The final render gets one more edit when the publisher could not show it
+    async def finish(self) -> None:
+        self._finished = True
+        self._changed.set()
+        if self._publisher is None:
+            return
+
+        try:
+            await self._publisher
+        except Exception:
+            logger.exception("Updating message %s in chat %s failed", self.message_id, self.chat_id)
+
+        text = self.render(True)
+        if text != self._last_text:
+            await self._edit(text)
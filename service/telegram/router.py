@@ -0,0 +1,85 @@
+from logging import getLogger
+from typing import Awaitable, Callable, Iterable, NamedTuple
+
+from telegram import Update
+from telegram.ext import ContextTypes
+
+from enums.ButtonAction import ButtonAction
+from enums.PayloadIdentifier import PayloadIdentifier
+
+
+logger = getLogger(__name__)
+
+
+class CallbackRequest(NamedTuple):
+    update: Update
+    context: ContextTypes.DEFAULT_TYPE
+    identifier: PayloadIdentifier
+    obj_id: str
+    # None when the button opens an object, name then holds the free text part of the payload
+    action: ButtonAction | None
+    name: str | None
+
+
+CallbackHandler = Callable[[CallbackRequest], Awaitable[None]]
+Middleware = Callable[[CallbackRequest, CallbackHandler], Awaitable[None]]
+
+
+# Maps (identifier, action) to a handler, each wrapped once in the middleware pipeline
+class CallbackRouter:
+    def __init__(self):
+        self._routes: dict[tuple[PayloadIdentifier, ButtonAction | None], CallbackHandler] = {}
+        self._middleware: list[Middleware] = []
+        self._pipelines: dict[tuple[PayloadIdentifier, ButtonAction | None], CallbackHandler] = {}
+
+    def route(
+        self, identifiers: PayloadIdentifier | Iterable[PayloadIdentifier], action: ButtonAction | None = None
+    ) -> Callable[[CallbackHandler], CallbackHandler]:
+        if isinstance(identifiers, PayloadIdentifier):
+            identifiers = (identifiers,)
+
+        def decorator(handler: CallbackHandler) -> CallbackHandler:
+            for identifier in identifiers:
+                self._routes[(identifier, action)] = handler
+            self._pipelines.clear()
+            return handler
+        return decorator
+
+    # Middleware added first runs outermost
+    def use(self, middleware: Middleware) -> 'CallbackRouter':
+        self._middleware.append(middleware)
+        self._pipelines.clear()
+        return self
+
+    def _build_pipeline(self, handler: CallbackHandler) -> CallbackHandler:
+        for middleware in reversed(self._middleware):
+            handler = self._wrap(middleware, handler)
+        return handler
+
+    @staticmethod
+    def _wrap(middleware: Middleware, handler: CallbackHandler) -> CallbackHandler:
+        async def wrapped(request: CallbackRequest) -> None:
+            await middleware(request, handler)
+        return wrapped
+
+    def resolve(self, identifier: PayloadIdentifier, action: ButtonAction | None) -> CallbackHandler | None:
+        key = (identifier, action)
+        pipeline = self._pipelines.get(key)
+        if pipeline is None:
+            handler = self._routes.get(key)
+            if handler is None:
+                return None
+            pipeline = self._pipelines[key] = self._build_pipeline(handler)
+        return pipeline
+
+    # Every callback query is answered here, unmatched ones with a notice so the client stops waiting
+    async def dispatch(self, request: CallbackRequest) -> None:
+        query = request.update.callback_query
+        pipeline = self.resolve(request.identifier, request.action)
+        if pipeline is None:
+            logger.warning("No route for callback %s with action %s", request.identifier, request.action)
+            await query.answer(text="This button is not supported anymore.", show_alert=True)
+            return
+
+        await query.answer()
+        await pipeline(request)
@@ -0,0 +1,307 @@
+import os
+import sys
+from asyncio import (
+    Event, Queue, QueueFull, StreamReader, StreamReaderProtocol, Task, create_subprocess_exec, create_task, gather,
+    get_running_loop, sleep, wait, wait_for, FIRST_COMPLETED
+)
+from asyncio.subprocess import Process, PIPE
+from json import dumps, loads, JSONDecodeError
+from logging import getLogger
+from os import environ
+from time import monotonic
+from typing import Any
+
+from telegram import Update
+from telegram.ext import Application, ApplicationBuilder, ContextTypes, TypeHandler
+
+from config import (
+    TELEGRAM_BOT_TOKEN,
+    METRICS_PORT,
+    ALERTS_ENABLED,
+    HTTP_SERVER_MAX_BODY,
+    SEND_GLOBAL_RATE,
+    SEND_GLOBAL_BURST,
+    SHARD_HEARTBEAT_FD,
+    SHARD_HEARTBEAT_INTERVAL,
+    SHARD_HEARTBEAT_TIMEOUT,
+    SHARD_RESTART_DELAY,
+    SHARD_QUEUE_SIZE,
+)
+from service.metrics import register_stats, start_metrics, stop_metrics
+from service.telegram.lifecycle import create_stop_event, running
+from service.temptake.ingest import get_entry_module, ingest_entries, start_ingest_server, stop_ingest
+
+
+logger = getLogger(__name__)
+
+
+# Updates of one chat always go to the same worker, so its pending actions and menus stay in one process
+def get_shard(update: Update, workers: int) -> int:
+    if update.effective_chat is not None:
+        return update.effective_chat.id % workers
+    if update.effective_user is not None:
+        return update.effective_user.id % workers
+    return 0
+
+
+# Environment of a worker. The workers share the bot's global flood limit, only the first one polls alerts,
+# and the supervisor serves the ingestion endpoint itself.
+def get_worker_environment(index: int, workers: int, heartbeat_fd: int) -> dict[str, str]:
+    return {
+        **environ,
+        "SHARD_INDEX": str(index),
+        "SHARD_HEARTBEAT_FD": str(heartbeat_fd),
+        "METRICS_PORT": str(METRICS_PORT + 1 + index) if METRICS_PORT else "",
+        "INGEST_PORT": "",
+        "ALERTS_ENABLED": "true" if index == 0 and ALERTS_ENABLED else "false",
+        "SEND_GLOBAL_RATE": str(SEND_GLOBAL_RATE / workers),
+        "SEND_GLOBAL_BURST": str(max(1, SEND_GLOBAL_BURST // workers)),
+    }
+
+
+class Shard:
+    def __init__(self, index: int):
+        self.index = index
+        self.process: Process | None = None
+        self.ready = Event()
+        self.queue: Queue[bytes] = Queue(maxsize=SHARD_QUEUE_SIZE)
+        self.last_heartbeat = 0.0
+        self.restarts = 0
+        self.forwarded = 0
+        self.dropped = 0
+
+
+# Runs the workers, hands each update to the worker owning its chat over the worker's stdin,
+# and restarts workers that exit or stop sending heartbeats.
+# Pushed entries are sent to every worker, since any chat may ask for the last entry of a module.
+# Messages already written to a worker that crashes are lost.
+class ShardSupervisor:
+    def __init__(self, workers: int, command: list[str] | None = None):
+        self.command = command or [sys.executable, *sys.argv]
+        self.shards = [Shard(index) for index in range(workers)]
+        self._tasks: set[Task] = set()
+        self._stopping = False
+
+    def _run(self, coroutine) -> None:
+        task = create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def start(self, *_) -> None:
+        for shard in self.shards:
+            await self._spawn(shard)
+            self._run(self._write(shard))
+        self._run(self._watch())
+
+    async def stop(self, *_) -> None:
+        self._stopping = True
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await gather(*tasks, return_exceptions=True)
+
+        processes = [shard.process for shard in self.shards if shard.process is not None]
+        for process in processes:
+            if process.returncode is None:
+                process.terminate()
+        await gather(*(self._wait_or_kill(process) for process in processes))
+
+    @staticmethod
+    async def _wait_or_kill(process: Process) -> None:
+        try:
+            await wait_for(process.wait(), SHARD_HEARTBEAT_TIMEOUT)
+        except TimeoutError:
+            process.kill()
+            await process.wait()
+
+    # A worker that does not keep up must not hold back the others, so its messages are dropped
+    def _send(self, shard: Shard, message: dict[str, Any]) -> None:
+        try:
+            shard.queue.put_nowait(dumps(message).encode() + b"\n")
+        except QueueFull:
+            shard.dropped += 1
+            logger.warning("Dropping a message for worker %s, %s are already queued", shard.index, shard.queue.qsize())
+
+    async def forward(self, update: Update, _: ContextTypes.DEFAULT_TYPE) -> None:
+        self._send(self.shards[get_shard(update, len(self.shards))], {"update": update.to_dict()})
+
+    # Ingests pushed entries in every worker
+    def broadcast_entries(self, entries: list[Any]) -> int:
+        entries = [entry for entry in entries if get_entry_module(entry) is not None]
+        if entries:
+            for shard in self.shards:
+                self._send(shard, {"entries": entries})
+        return len(entries)
+
+    async def _spawn(self, shard: Shard) -> None:
+        read_fd, write_fd = os.pipe()
+        try:
+            process = await create_subprocess_exec(
+                *self.command,
+                stdin=PIPE,
+                env=get_worker_environment(shard.index, len(self.shards), write_fd),
+                pass_fds=(write_fd,),
+                # Ctrl+C reaches the supervisor only, it stops the workers itself
+                start_new_session=True
+            )
+        except BaseException:
+            os.close(read_fd)
+            raise
+        finally:
+            os.close(write_fd)
+
+        shard.process = process
+        shard.last_heartbeat = monotonic()
+        shard.ready.set()
+        self._run(self._read_heartbeats(shard, process, read_fd))
+        self._run(self._supervise(shard, process))
+        logger.info("Started worker %s with pid %s", shard.index, process.pid)
+
+    async def _read_heartbeats(self, shard: Shard, process: Process, read_fd: int) -> None:
+        reader = StreamReader()
+        transport, _ = await get_running_loop().connect_read_pipe(
+            lambda: StreamReaderProtocol(reader), os.fdopen(read_fd, "rb", buffering=0)
+        )
+        try:
+            while await reader.readline():
+                if shard.process is process:
+                    shard.last_heartbeat = monotonic()
+        finally:
+            transport.close()
+
+    async def _supervise(self, shard: Shard, process: Process) -> None:
+        returncode = await process.wait()
+        if self._stopping:
+            return
+
+        shard.ready.clear()
+        shard.restarts += 1
+        logger.error("Worker %s exited with %s, restarting", shard.index, returncode)
+        while True:
+            await sleep(SHARD_RESTART_DELAY)
+            try:
+                await self._spawn(shard)
+                return
+            except OSError:
+                logger.exception("Could not restart worker %s", shard.index)
+
+    # A worker that stopped sending heartbeats is hung, killing it makes _supervise restart it
+    async def _watch(self) -> None:
+        while True:
+            await sleep(SHARD_HEARTBEAT_INTERVAL)
+            for shard in self.shards:
+                process = shard.process
+                if process is None or process.returncode is not None:
+                    continue
+                if monotonic() - shard.last_heartbeat > SHARD_HEARTBEAT_TIMEOUT:
+                    logger.error("Worker %s missed its heartbeats, killing it", shard.index)
+                    process.kill()
+
+    # Updates are written in order, an update that could not be written is sent to the restarted worker
+    async def _write(self, shard: Shard) -> None:
+        line = None
+        while True:
+            if line is None:
+                line = await shard.queue.get()
+            await shard.ready.wait()
+
+            process = shard.process
+            try:
+                process.stdin.write(line)
+                await process.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                if shard.process is process:
+                    shard.ready.clear()
+                continue
+
+            line = None
+            shard.forwarded += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "workers_alive": sum(
+                shard.process is not None and shard.process.returncode is None for shard in self.shards
+            ),
+            "restarts": sum(shard.restarts for shard in self.shards),
+            "forwarded": sum(shard.forwarded for shard in self.shards),
+            "dropped": sum(shard.dropped for shard in self.shards),
+            "queued": sum(shard.queue.qsize() for shard in self.shards),
+        }
+
+
+# The application of the supervisor process, it only receives updates and forwards them
+def create_supervisor_application(workers: int) -> Application:
+    supervisor = ShardSupervisor(workers)
+    register_stats("temptake_bot_shards", "Worker process statistics.", supervisor.stats)
+
+    async def post_init(application: Application) -> None:
+        await supervisor.start()
+        await start_metrics(application)
+        await start_ingest_server(supervisor.broadcast_entries)
+
+    async def post_shutdown(application: Application) -> None:
+        await stop_ingest(application)
+        await stop_metrics(application)
+        await supervisor.stop()
+
+    application = (
+        ApplicationBuilder()
+        .token(TELEGRAM_BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
+    application.add_handler(TypeHandler(Update, supervisor.forward))
+    return application
+
+
+async def send_heartbeats(stop_event: Event) -> None:
+    while not stop_event.is_set():
+        try:
+            os.write(SHARD_HEARTBEAT_FD, b"\n")
+        except OSError:
+            # The supervisor is gone
+            stop_event.set()
+            return
+        await sleep(SHARD_HEARTBEAT_INTERVAL)
+
+
+async def receive_updates(application: Application) -> None:
+    # Entries are encoded again by the supervisor, which may make them longer than the request body was
+    reader = StreamReader(limit=4 * HTTP_SERVER_MAX_BODY)
+    await get_running_loop().connect_read_pipe(lambda: StreamReaderProtocol(reader), sys.stdin)
+    while True:
+        try:
+            line = await reader.readline()
+        except ValueError:
+            logger.warning("Dropping a message that is too long")
+            continue
+        if not line:
+            return
+
+        try:
+            message = loads(line)
+            if "entries" in message:
+                ingest_entries(message["entries"])
+                continue
+            update = Update.de_json(message["update"], application.bot)
+        except (JSONDecodeError, UnicodeDecodeError, TypeError, KeyError):
+            logger.warning("Dropping a message that could not be decoded")
+            continue
+        await application.update_queue.put(update)
+
+
+# Process the updates the supervisor forwards until stdin closes or SIGINT/SIGTERM
+async def run_shard_worker(application: Application) -> None:
+    stop_event = create_stop_event()
+
+    async with running(application):
+        heartbeats = create_task(send_heartbeats(stop_event))
+        receiver = create_task(receive_updates(application))
+        stopped = create_task(stop_event.wait())
+        try:
+            await wait((receiver, stopped), return_when=FIRST_COMPLETED)
+        finally:
+            for task in (heartbeats, receiver, stopped):
+                task.cancel()
+            await gather(heartbeats, receiver, stopped, return_exceptions=True)
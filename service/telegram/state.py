@@ -0,0 +1,128 @@
+import sqlite3
+from abc import ABC, abstractmethod
+from asyncio import to_thread
+from collections import OrderedDict
+from json import dumps, loads
+from threading import Lock
+from time import time
+from typing import Any
+
+from config import STATE_BACKEND, STATE_SQLITE_PATH, STATE_TTL, STATE_MAX_SIZE
+from enums.PendingAction import PendingAction
+
+
+# Pending actions of a chat, e.g. the group waiting for a manager MAC
+class StateStore(ABC):
+    @abstractmethod
+    async def set(self, action: PendingAction, chat_id: int, value: Any) -> None:
+        ...
+
+    @abstractmethod
+    async def get(self, action: PendingAction, chat_id: int) -> Any | None:
+        ...
+
+    @abstractmethod
+    async def pop(self, action: PendingAction, chat_id: int) -> Any | None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryStateStore(StateStore):
+    def __init__(self, ttl: float = STATE_TTL, max_size: int = STATE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._values: OrderedDict[tuple[PendingAction, int], tuple[Any, float]] = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        for key in [key for key, (_, expires_at) in self._values.items() if expires_at <= now]:
+            del self._values[key]
+        while len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+
+    async def set(self, action: PendingAction, chat_id: int, value: Any) -> None:
+        now = time()
+        self._values[(action, chat_id)] = (value, now + self.ttl)
+        self._values.move_to_end((action, chat_id))
+        if len(self._values) > self.max_size:
+            self._evict(now)
+
+    async def get(self, action: PendingAction, chat_id: int) -> Any | None:
+        stored = self._values.get((action, chat_id))
+        if stored is None or stored[1] <= time():
+            return None
+        return stored[0]
+
+    async def pop(self, action: PendingAction, chat_id: int) -> Any | None:
+        stored = self._values.pop((action, chat_id), None)
+        if stored is None or stored[1] <= time():
+            return None
+        return stored[0]
+
+
+# Shared by every bot process that points at the same database file
+class SqliteStateStore(StateStore):
+    def __init__(self, path: str = STATE_SQLITE_PATH, ttl: float = STATE_TTL, max_size: int = STATE_MAX_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = Lock()
+        self._connection = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS pending_state ("
+            "action TEXT NOT NULL, chat_id INTEGER NOT NULL, value TEXT NOT NULL, expires_at REAL NOT NULL, "
+            "PRIMARY KEY (action, chat_id))"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS pending_state_expiry ON pending_state (expires_at)")
+
+    def _set(self, action: PendingAction, chat_id: int, value: Any) -> None:
+        now = time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO pending_state VALUES (?, ?, ?, ?)",
+                (action.value, chat_id, dumps(value), now + self.ttl)
+            )
+            self._connection.execute("DELETE FROM pending_state WHERE expires_at <= ?", (now,))
+            self._connection.execute(
+                "DELETE FROM pending_state WHERE rowid IN ("
+                "SELECT rowid FROM pending_state ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_size,)
+            )
+
+    def _get(self, action: PendingAction, chat_id: int, delete: bool) -> Any | None:
+        statement = "DELETE FROM pending_state" if delete else "SELECT value FROM pending_state"
+        suffix = " RETURNING value" if delete else ""
+        with self._lock:
+            row = self._connection.execute(
+                f"{statement} WHERE action = ? AND chat_id = ? AND expires_at > ?{suffix}",
+                (action.value, chat_id, time())
+            ).fetchone()
+        return None if row is None else loads(row[0])
+
+    async def set(self, action: PendingAction, chat_id: int, value: Any) -> None:
+        await to_thread(self._set, action, chat_id, value)
+
+    async def get(self, action: PendingAction, chat_id: int) -> Any | None:
+        return await to_thread(self._get, action, chat_id, False)
+
+    async def pop(self, action: PendingAction, chat_id: int) -> Any | None:
+        return await to_thread(self._get, action, chat_id, True)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+def create_state_store() -> StateStore:
+    if STATE_BACKEND == "sqlite":
+        return SqliteStateStore()
+    return MemoryStateStore()
+
+
+state_store = create_state_store()
+
+
+# Application post_shutdown hook
+async def close_state_store(*_) -> None:
+    await state_store.close()
@@ -0,0 +1,93 @@
+from asyncio import Lock, Semaphore
+from inspect import iscoroutine
+from logging import getLogger
+from typing import Any, Awaitable
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+from config import UPDATE_CONCURRENCY, UPDATE_MAX_PENDING, UPDATE_CHAT_QUEUE_LIMIT
+
+
+logger = getLogger(__name__)
+
+
+class ChatQueue:
+    def __init__(self):
+        self.lock = Lock()
+        self.depth = 0
+
+
+# Runs updates of different chats concurrently while keeping the order within each chat
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    def __init__(
+        self,
+        concurrency: int = UPDATE_CONCURRENCY,
+        max_pending: int = UPDATE_MAX_PENDING,
+        chat_queue_limit: int = UPDATE_CHAT_QUEUE_LIMIT
+    ):
+        # The base semaphore bounds queued + running updates, ours bounds the running ones
+        super().__init__(max_concurrent_updates=max(max_pending, concurrency))
+        self.concurrency = concurrency
+        self.chat_queue_limit = chat_queue_limit
+        self.dropped = 0
+        self.running = 0
+        self._running_semaphore = Semaphore(concurrency)
+        self._chats: dict[int, ChatQueue] = {}
+
+    @staticmethod
+    def get_chat_id(update: object) -> int | None:
+        if isinstance(update, Update) and update.effective_chat is not None:
+            return update.effective_chat.id
+        return None
+
+    async def _run(self, coroutine: Awaitable[Any]) -> None:
+        async with self._running_semaphore:
+            self.running += 1
+            try:
+                await coroutine
+            finally:
+                self.running -= 1
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        chat_id = self.get_chat_id(update)
+        if chat_id is None:
+            await self._run(coroutine)
+            return
+
+        chat_queue = self._chats.setdefault(chat_id, ChatQueue())
+        if chat_queue.depth >= self.chat_queue_limit:
+            self.dropped += 1
+            logger.warning("Dropping update for chat %s, %s updates already queued", chat_id, chat_queue.depth)
+            if iscoroutine(coroutine):
+                coroutine.close()
+            return
+
+        chat_queue.depth += 1
+        try:
+            async with chat_queue.lock:
+                await self._run(coroutine)
+        finally:
+            chat_queue.depth -= 1
+            if not chat_queue.depth:
+                self._chats.pop(chat_id, None)
+
+    def chat_depth(self, chat_id: int) -> int:
+        chat_queue = self._chats.get(chat_id)
+        return chat_queue.depth if chat_queue else 0
+
+    def stats(self) -> dict[str, int]:
+        depths = [chat_queue.depth for chat_queue in self._chats.values()]
+        return {
+            "running": self.running,
+            "queued": sum(depths) - sum(1 for chat_queue in self._chats.values() if chat_queue.lock.locked()),
+            "chats": len(depths),
+            "max_chat_depth": max(depths, default=0),
+            "dropped": self.dropped,
+        }
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
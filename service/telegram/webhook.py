@@ -0,0 +1,62 @@
+from hmac import compare_digest
+from http import HTTPStatus
+from json import loads, JSONDecodeError
+
+from telegram import Update
+from telegram.ext import Application
+
+from config import WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_URL, WEBHOOK_SECRET
+from service.telegram.lifecycle import create_stop_event, running
+from util.http_server import HttpServer, HttpRequest, HttpResponse
+
+
+SECRET_TOKEN_HEADER = "x-telegram-bot-api-secret-token"
+
+
+def create_webhook_server(application: Application, host: str = WEBHOOK_LISTEN, port: int = WEBHOOK_PORT) -> HttpServer:
+    async def receive_update(request: HttpRequest) -> HttpResponse:
+        if not compare_digest(request.headers.get(SECRET_TOKEN_HEADER, ""), WEBHOOK_SECRET or ""):
+            return HttpResponse(HTTPStatus.FORBIDDEN)
+
+        try:
+            update = Update.de_json(loads(request.body), application.bot)
+        except (JSONDecodeError, UnicodeDecodeError, TypeError, KeyError):
+            return HttpResponse(HTTPStatus.BAD_REQUEST)
+
+        await application.update_queue.put(update)
+        return HttpResponse(HTTPStatus.OK)
+
+    async def health(_: HttpRequest) -> HttpResponse:
+        if application.running:
+            return HttpResponse(HTTPStatus.OK, b"ok")
+        return HttpResponse(HTTPStatus.SERVICE_UNAVAILABLE, b"stopping")
+
+    return (
+        HttpServer(host, port)
+        .route("POST", WEBHOOK_PATH, receive_update)
+        .route("GET", "/healthz", health)
+    )
+
+
+# Serve updates through the webhook receiver until SIGINT/SIGTERM
+async def run_webhook(application: Application) -> None:
+    if not WEBHOOK_SECRET:
+        raise ValueError("WEBHOOK_SECRET must be set in webhook mode")
+
+    stop_event = create_stop_event()
+    server = create_webhook_server(application)
+
+    async with running(application):
+        # Without a public URL the receiver only accepts locally POSTed updates
+        if WEBHOOK_URL:
+            await application.bot.set_webhook(
+                url=f"{WEBHOOK_URL}{WEBHOOK_PATH}",
+                secret_token=WEBHOOK_SECRET,
+                allowed_updates=Update.ALL_TYPES
+            )
+
+        await server.start()
+        try:
+            await stop_event.wait()
+        finally:
+            await server.stop()
@@ -0,0 +1,60 @@
+from time import monotonic
+
+from config import BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT
+from enums.BreakerState import BreakerState
+
+
+# Stops sending to TempTake after consecutive failures, then lets a single probe through once the timeout passed
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = BREAKER_FAILURE_THRESHOLD, reset_timeout: float = BREAKER_RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.opened = 0
+        self.rejected = 0
+        self._probing = False
+
+    def allow(self) -> bool:
+        if self.state == BreakerState.CLOSED:
+            return True
+
+        if self.state == BreakerState.OPEN and monotonic() - self.opened_at >= self.reset_timeout:
+            self.state = BreakerState.HALF_OPEN
+
+        if self.state == BreakerState.HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self._probing = False
+
+    # A probe that ended without an answer from TempTake lets the next request probe instead
+    def release(self) -> None:
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probing = False
+        if self.state == BreakerState.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != BreakerState.OPEN:
+                self.opened += 1
+            self.state = BreakerState.OPEN
+            self.opened_at = monotonic()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "state": int(self.state),
+            "consecutive_failures": self.failures,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
+
+
+circuit_breaker = CircuitBreaker()
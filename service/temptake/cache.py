@@ -0,0 +1,119 @@
+from collections import OrderedDict
+from json import dumps
+from time import monotonic
+from typing import Any, NamedTuple
+
+from httpx import Response
+
+from config import TOPOLOGY_CACHE_TTL, TOPOLOGY_CACHE_SIZE
+from enums.Endpoint import Endpoint
+from enums.JsonIdentifier import JsonIdentifier
+from enums.Method import Method
+
+
+# GET endpoints whose responses describe the group/manager/worker topology
+CACHEABLE_ENDPOINTS = {
+    Endpoint.USER_GROUPS,
+    Endpoint.GROUP_MANAGERS,
+    Endpoint.MANAGER_WORKERS,
+    Endpoint.MANAGER,
+    Endpoint.WORKER,
+}
+
+
+class CacheKey(NamedTuple):
+    user: str
+    endpoint: Endpoint
+    resource_id: str | None
+    body: str
+
+
+class CacheEntry(NamedTuple):
+    response: Response
+    expires_at: float
+
+
+def get_resource_id(json: dict[str, Any] | None) -> str | None:
+    if not json:
+        return None
+    resource_id = json.get(JsonIdentifier.ID_KEY.value, json.get("GroupId"))
+    return None if resource_id is None else str(resource_id)
+
+
+def _list_contains_id(response: Response, resource_id: str) -> bool:
+    return any(str(row.get(JsonIdentifier.ID_KEY.value)) == resource_id for row in response.json())
+
+
+# Per-user read-through cache with TTL and LRU eviction
+class TopologyCache:
+    def __init__(self, ttl: float = TOPOLOGY_CACHE_TTL, max_size: int = TOPOLOGY_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[CacheKey, CacheEntry] = OrderedDict()
+
+    @staticmethod
+    def is_cacheable(method: Method, endpoint: Endpoint) -> bool:
+        return method == Method.GET and endpoint in CACHEABLE_ENDPOINTS
+
+    @staticmethod
+    def make_key(user: str, endpoint: Endpoint, json: dict[str, Any] | None) -> CacheKey:
+        return CacheKey(user, endpoint, get_resource_id(json), dumps(json, sort_keys=True, default=str))
+
+    def get(self, key: CacheKey) -> Response | None:
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.response
+
+    def put(self, key: CacheKey, response: Response) -> None:
+        if not response.is_success:
+            return
+
+        self._entries[key] = CacheEntry(response, monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _drop(self, endpoint: Endpoint, resource_id: str | None = None, contains_id: str | None = None) -> None:
+        for key in list(self._entries):
+            if key.endpoint != endpoint:
+                continue
+            if resource_id is not None and key.resource_id != resource_id:
+                continue
+            if contains_id is not None and not _list_contains_id(self._entries[key].response, contains_id):
+                continue
+            del self._entries[key]
+
+    # Drop every cached response, for any user, that a successful write made stale
+    def invalidate(self, method: Method, endpoint: Endpoint, json: dict[str, Any] | None) -> None:
+        resource_id = get_resource_id(json)
+
+        if method == Method.POST and endpoint == Endpoint.GROUP_MANAGER:
+            self._drop(Endpoint.GROUP_MANAGERS, resource_id=resource_id)
+        elif method == Method.POST and endpoint == Endpoint.MANAGER_WORKER:
+            self._drop(Endpoint.MANAGER_WORKERS, resource_id=resource_id)
+        elif method == Method.DELETE and endpoint == Endpoint.MANAGER:
+            self._drop(Endpoint.GROUP_MANAGERS, contains_id=resource_id)
+            self._drop(Endpoint.MANAGER, resource_id=resource_id)
+            self._drop(Endpoint.MANAGER_WORKERS, resource_id=resource_id)
+        elif method == Method.DELETE and endpoint == Endpoint.WORKER:
+            self._drop(Endpoint.MANAGER_WORKERS, contains_id=resource_id)
+            self._drop(Endpoint.WORKER, resource_id=resource_id)
+        elif method != Method.GET and endpoint in {Endpoint.USER, Endpoint.GROUP}:
+            self._drop(Endpoint.USER_GROUPS)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+topology_cache = TopologyCache()
@@ -0,0 +1,58 @@
+from httpx import AsyncClient, Limits, Timeout
+
+from config import (
+    URL_PREFIX,
+    SERVER_URI,
+    HTTP_MAX_CONNECTIONS,
+    HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    HTTP_KEEPALIVE_EXPIRY,
+    HTTP_TIMEOUT,
+    HTTP_CONNECT_TIMEOUT,
+    HTTP2_ENABLED,
+)
+
+
+# Long-lived client shared by every TempTake request
+_client: AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_client() -> AsyncClient:
+    return AsyncClient(
+        base_url=f"{URL_PREFIX}{SERVER_URI}",
+        limits=Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+        ),
+        timeout=Timeout(HTTP_TIMEOUT, connect=HTTP_CONNECT_TIMEOUT),
+        http2=HTTP2_ENABLED and _http2_available(),
+    )
+
+
+# Get the shared client, creating it on first use if the application did not open it
+def get_client() -> AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_client()
+    return _client
+
+
+# Application post_init hook
+async def open_client(*_) -> None:
+    get_client()
+
+
+# Application post_shutdown hook
+async def close_client(*_) -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,113 @@
+from asyncio import Task, create_task
+from http import HTTPStatus
+from json import loads, dumps, JSONDecodeError
+from logging import getLogger
+from typing import Any, Callable
+
+from config import INGEST_LISTEN, INGEST_PORT, INGEST_PATH, INGEST_AUDIENCE
+from enums.JsonIdentifier import JsonIdentifier
+from enums.PayloadIdentifier import PayloadIdentifier
+from service.alerts import poller
+from service.alerts.store import get_subscription_store
+from service.temptake.latest import latest_entries
+from util.http_server import HttpHandler, HttpServer, HttpRequest, HttpResponse
+from util.security import verify_internal_jwt
+from util.statistics import get_entry_timestamp
+
+
+logger = getLogger(__name__)
+
+# Pushed entries name their module through one of these keys
+MODULE_ID_KEYS = {
+    JsonIdentifier.MANAGER_ID_KEY.value: PayloadIdentifier.MANAGER_IDENTIFIER.value,
+    JsonIdentifier.WORKER_ID_KEY.value: PayloadIdentifier.WORKER_IDENTIFIER.value,
+}
+
+_fan_out_tasks: set[Task] = set()
+_ingest_server: HttpServer | None = None
+
+
+# The module of a pushed entry, None for entries that name no module or have a malformed timestamp
+def get_entry_module(entry: Any) -> tuple[str, int] | None:
+    if not isinstance(entry, dict):
+        return None
+    try:
+        get_entry_timestamp(entry)
+    except (ValueError, TypeError, AttributeError):
+        return None
+    for key, identifier in MODULE_ID_KEYS.items():
+        module_id = entry.get(key)
+        if isinstance(module_id, int):
+            return identifier, module_id
+    return None
+
+
+async def notify_subscribers(identifier: str, module_id: int, entry: dict[str, Any]) -> None:
+    if poller.alert_poller is None:
+        return
+    subscriptions = await get_subscription_store().for_module(identifier, module_id)
+    if subscriptions:
+        await poller.alert_poller.process_entry(entry, subscriptions)
+
+
+# Record pushed entries as the latest state of their modules and alert interested chats
+def ingest_entries(entries: list[Any]) -> int:
+    changed: dict[tuple[str, int], dict[str, Any]] = {}
+    accepted = 0
+    for entry in entries:
+        module = get_entry_module(entry)
+        if module is None:
+            continue
+        accepted += 1
+        if latest_entries.update(*module, entry):
+            changed[module] = entry
+
+    for (identifier, module_id), entry in changed.items():
+        task = create_task(notify_subscribers(identifier, module_id, entry))
+        _fan_out_tasks.add(task)
+        task.add_done_callback(_fan_out_tasks.discard)
+
+    return accepted
+
+
+# The handler of the ingestion endpoint, passing the entries of each request to ingest
+def create_entry_receiver(ingest: Callable[[list[Any]], int]) -> HttpHandler:
+    async def receive_entries(request: HttpRequest) -> HttpResponse:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or verify_internal_jwt(token, INGEST_AUDIENCE) is None:
+            return HttpResponse(HTTPStatus.UNAUTHORIZED)
+
+        try:
+            payload = loads(request.body)
+        except (JSONDecodeError, UnicodeDecodeError):
+            return HttpResponse(HTTPStatus.BAD_REQUEST)
+
+        entries = payload if isinstance(payload, list) else [payload]
+        accepted = ingest(entries)
+        if not accepted:
+            return HttpResponse(HTTPStatus.BAD_REQUEST, b"No valid entry names its module")
+
+        return HttpResponse(HTTPStatus.ACCEPTED, dumps({"accepted": accepted}).encode(), "application/json")
+
+    return receive_entries
+
+
+async def start_ingest_server(ingest: Callable[[list[Any]], int]) -> None:
+    global _ingest_server
+    if not INGEST_PORT:
+        return
+    _ingest_server = HttpServer(INGEST_LISTEN, INGEST_PORT).route("POST", INGEST_PATH, create_entry_receiver(ingest))
+    await _ingest_server.start()
+
+
+# Application post_init hook
+async def start_ingest(*_) -> None:
+    await start_ingest_server(ingest_entries)
+
+
+# Application post_shutdown hook
+async def stop_ingest(*_) -> None:
+    global _ingest_server
+    if _ingest_server is not None:
+        await _ingest_server.stop()
+        _ingest_server = None
@@ -0,0 +1,48 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from time import monotonic
+from typing import Any, NamedTuple
+
+from config import LATEST_ENTRY_CACHE_SIZE
+from util.statistics import get_entry_timestamp
+
+
+class LatestEntry(NamedTuple):
+    entry: dict[str, Any]
+    timestamp: datetime
+    received_at: float
+
+
+# Newest known entry of every module, kept up to date by the push ingestion endpoint
+class LatestEntryStore:
+    def __init__(self, max_size: int = LATEST_ENTRY_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[str, int], LatestEntry] = OrderedDict()
+
+    # Returns whether the entry is newer than the one already known
+    def update(self, identifier: str, module_id: int, entry: dict[str, Any]) -> bool:
+        timestamp = get_entry_timestamp(entry) or datetime.now(timezone.utc)
+        key = (identifier, module_id)
+        current = self._entries.get(key)
+        if current is not None and current.timestamp >= timestamp:
+            return False
+
+        self._entries[key] = LatestEntry(entry, timestamp, monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return True
+
+    def get(self, identifier: str, module_id: int) -> dict[str, Any] | None:
+        latest = self._entries.get((identifier, module_id))
+        return None if latest is None else latest.entry
+
+    def is_fresh(self, identifier: str, module_id: int, max_age: float) -> bool:
+        latest = self._entries.get((identifier, module_id))
+        return latest is not None and monotonic() - latest.received_at <= max_age
+
+    def stats(self) -> dict[str, int]:
+        return {"modules": len(self._entries)}
+
+
+latest_entries = LatestEntryStore()
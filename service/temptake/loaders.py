@@ -0,0 +1,45 @@
+from asyncio import gather
+from typing import Any, NamedTuple
+
+from httpx import Response
+from telegram import Update
+
+from enums.Endpoint import Endpoint
+from enums.JsonIdentifier import JsonIdentifier
+from enums.Method import Method
+from enums.PayloadIdentifier import PayloadIdentifier
+from service.temptake.requests import make_request
+
+
+class RequestSpec(NamedTuple):
+    method: Method
+    endpoint: Endpoint
+    json: dict[str, Any] | None = None
+
+
+# Issue independent requests concurrently, responses are returned in the order of the specs
+async def load_all(update: Update, *specs: RequestSpec) -> list[Response]:
+    return list(await gather(*(
+        make_request(
+            method=spec.method,
+            endpoint=spec.endpoint,
+            update=update,
+            json=spec.json
+        ) for spec in specs
+    )))
+
+
+MODULE_ENDPOINTS = {
+    PayloadIdentifier.MANAGER_IDENTIFIER: Endpoint.MANAGER,
+    PayloadIdentifier.WORKER_IDENTIFIER: Endpoint.WORKER,
+}
+
+
+# Look up a manager or worker as the user, answered from the topology cache on repeated clicks
+async def load_module(update: Update, identifier: PayloadIdentifier, module_id: str) -> Response:
+    return await make_request(
+        method=Method.GET,
+        endpoint=MODULE_ENDPOINTS[identifier],
+        update=update,
+        json={JsonIdentifier.ID_KEY.value: module_id}
+    )
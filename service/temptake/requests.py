@@ -1,28 +1,231 @@
-from typing import Any
+from asyncio import Task, create_task, shield, sleep
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from http import HTTPStatus
+from json import dumps
+from random import uniform
+from time import perf_counter
+from typing import Any, AsyncIterator
 
-from httpx import AsyncClient
+from httpx import Request, Response, TransportError
 from telegram import Update
 
-from config import URL_PREFIX, SERVER_URI
+from config import HTTP_RETRIES, HTTP_RETRY_BACKOFF
 from enums.Endpoint import Endpoint
+from enums.JsonIdentifier import JsonIdentifier
 from enums.Method import Method
+from service.metrics import temptake_request_seconds, temptake_responses
+from service.temptake.breaker import circuit_breaker
+from service.temptake.cache import topology_cache
+from service.temptake.client import get_client
 from util.security import generate_jwt, get_user_credentials
 
 
+# Responses of GETs already made while handling the current update, set by the router middleware
+request_scope: ContextVar[dict | None] = ContextVar("request_scope", default=None)
+
+IDEMPOTENT_METHODS = {Method.GET, Method.PUT, Method.DELETE}
+
+# TempTake or its proxy is struggling, the same request may succeed a moment later.
+# Any other 5xx counts against the circuit breaker as well, but is not retried.
+RETRY_STATUSES = {HTTPStatus.BAD_GATEWAY, HTTPStatus.SERVICE_UNAVAILABLE, HTTPStatus.GATEWAY_TIMEOUT}
+
+# GETs in progress, identical GETs of the same user made meanwhile wait for the same response
+_in_flight: dict[tuple[str, Endpoint, str], Task] = {}
+
+_counters = {"deduplicated": 0, "retries": 0}
+
+
+def request_stats() -> dict[str, int]:
+    return {**_counters, "in_flight": len(_in_flight)}
+
+
+# Answered without contacting TempTake, so callers handle it like any other failed response
+def unavailable_response(method: Method, endpoint: Endpoint) -> Response:
+    return Response(
+        HTTPStatus.SERVICE_UNAVAILABLE,
+        text="TempTake is not reachable right now, please try again later.",
+        request=Request(method.value, endpoint.value)
+    )
+
+
+def get_headers(credentials: dict[str, str]) -> dict[str, str]:
+    return {
+        "Authorization": f"Bearer {generate_jwt(credentials)}",
+        "Content-Type": "application/json",
+    }
+
+
+async def send_request(
+    method: Method,
+    endpoint: Endpoint,
+    json: dict[str, Any] | None,
+    credentials: dict[str, str]
+) -> Response:
+    response = None
+    attempts = 1 + (HTTP_RETRIES if method in IDEMPOTENT_METHODS else 0)
+    for attempt in range(attempts):
+        if attempt:
+            _counters["retries"] += 1
+            await sleep(uniform(0, HTTP_RETRY_BACKOFF * 2 ** attempt))
+
+        if not circuit_breaker.allow():
+            temptake_responses.inc(endpoint.name, method.value, "rejected")
+            return unavailable_response(method, endpoint)
+
+        started = perf_counter()
+        try:
+            response = await get_client().request(
+                method=method.value,
+                url=endpoint.value,
+                json=json,
+                headers=get_headers(credentials)
+            )
+        except TransportError:
+            temptake_responses.inc(endpoint.name, method.value, "error")
+            circuit_breaker.record_failure()
+            response = None
+            continue
+        except Exception:
+            temptake_responses.inc(endpoint.name, method.value, "error")
+            circuit_breaker.release()
+            raise
+        except BaseException:
+            circuit_breaker.release()
+            raise
+        finally:
+            temptake_request_seconds.observe(perf_counter() - started, endpoint.name, method.value)
+
+        temptake_responses.inc(endpoint.name, method.value, str(response.status_code))
+
+        if response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            circuit_breaker.record_failure()
+        else:
+            circuit_breaker.record_success()
+        if response.status_code not in RETRY_STATUSES:
+            return response
+
+    return response if response is not None else unavailable_response(method, endpoint)
+
+
 async def make_request(
     method: Method,
     endpoint: Endpoint,
-    update: Update,
+    update: Update | None,
     json: dict[str, Any] | None = None,
+    credentials: dict[str, str] | None = None,
 ):
-    async with AsyncClient() as client:
-        response = await client.request(
-            method=method.value,
-            url=f"{URL_PREFIX}{SERVER_URI}{endpoint.value}",
-            json=json,
-            headers={
-                "Authorization": f"Bearer {generate_jwt(get_user_credentials(update))}",
-                "Content-Type": "application/json",
-            }
+    # Background jobs have no update and pass the credentials of the user they act for
+    if credentials is None:
+        credentials = get_user_credentials(update)
+
+    scope = request_scope.get() if method == Method.GET else None
+    scope_key = None
+    if scope is not None:
+        scope_key = (endpoint, dumps(json, sort_keys=True, default=str))
+        scoped_response = scope.get(scope_key)
+        if scoped_response is not None:
+            return scoped_response
+
+    cache_key = None
+    if topology_cache.is_cacheable(method, endpoint):
+        cache_key = topology_cache.make_key(credentials[JsonIdentifier.TELEGRAM_ID_KEY.value], endpoint, json)
+        cached_response = topology_cache.get(cache_key)
+        if cached_response is not None:
+            if scope_key is not None:
+                scope[scope_key] = cached_response
+            return cached_response
+
+    if method == Method.GET:
+        flight_key = (
+            credentials[JsonIdentifier.TELEGRAM_ID_KEY.value], endpoint, dumps(json, sort_keys=True, default=str)
         )
+        flight = _in_flight.get(flight_key)
+        if flight is None:
+            flight = create_task(send_request(method, endpoint, json, credentials))
+            _in_flight[flight_key] = flight
+            flight.add_done_callback(lambda _: _in_flight.pop(flight_key, None))
+        else:
+            _counters["deduplicated"] += 1
+        # A cancelled caller must not cancel the request the others are waiting for
+        response = await shield(flight)
+    else:
+        response = await send_request(method, endpoint, json, credentials)
+
+    if scope_key is not None:
+        scope[scope_key] = response
+
+    if cache_key is not None:
+        topology_cache.put(cache_key, response)
+    elif method != Method.GET and response.is_success:
+        topology_cache.invalidate(method, endpoint, json)
+        write_scope = request_scope.get()
+        if write_scope:
+            write_scope.clear()
+
     return response
+
+
+# Entry responses can be large, so the body is left unread for the caller to consume as a stream.
+# Streams are neither cached, shared nor retried.
+@asynccontextmanager
+async def stream_request(
+    method: Method,
+    endpoint: Endpoint,
+    update: Update | None,
+    json: dict[str, Any] | None = None,
+    credentials: dict[str, str] | None = None,
+) -> AsyncIterator[Response]:
+    if credentials is None:
+        credentials = get_user_credentials(update)
+
+    if not circuit_breaker.allow():
+        temptake_responses.inc(endpoint.name, method.value, "rejected")
+        yield unavailable_response(method, endpoint)
+        return
+
+    client = get_client()
+    started = perf_counter()
+    response = None
+    try:
+        response = await client.send(
+            client.build_request(method=method.value, url=endpoint.value, json=json, headers=get_headers(credentials)),
+            stream=True
+        )
+    except TransportError:
+        temptake_responses.inc(endpoint.name, method.value, "error")
+        circuit_breaker.record_failure()
+    except BaseException as error:
+        if isinstance(error, Exception):
+            temptake_responses.inc(endpoint.name, method.value, "error")
+        circuit_breaker.release()
+        temptake_request_seconds.observe(perf_counter() - started, endpoint.name, method.value)
+        raise
+
+    if response is None:
+        temptake_request_seconds.observe(perf_counter() - started, endpoint.name, method.value)
+        yield unavailable_response(method, endpoint)
+        return
+
+    temptake_responses.inc(endpoint.name, method.value, str(response.status_code))
+    failed = response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR
+    if failed:
+        circuit_breaker.record_failure()
+
+    # A success is only recorded once the body was read, TempTake may still fail while sending it
+    try:
+        yield response
+    except TransportError:
+        if not failed:
+            circuit_breaker.record_failure()
+        raise
+    except BaseException:
+        if not failed:
+            circuit_breaker.release()
+        raise
+    else:
+        if not failed:
+            circuit_breaker.record_success()
+    finally:
+        await response.aclose()
+        temptake_request_seconds.observe(perf_counter() - started, endpoint.name, method.value)
@@ -0,0 +1,331 @@
+import sqlite3
+from array import array
+from asyncio import Lock, gather, to_thread
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from json import dumps, loads
+from threading import Lock as ThreadLock
+from time import time
+from typing import Any, AsyncIterator
+
+from telegram import Update
+
+from config import SERIES_CACHE_SIZE, SERIES_MAX_POINTS, SERIES_RETENTION, SERIES_SETTLE, SERIES_SQLITE_PATH
+from enums.Endpoint import Endpoint
+from enums.JsonIdentifier import JsonIdentifier
+from enums.Method import Method
+from enums.PayloadIdentifier import PayloadIdentifier
+from service.telegram.error_handlers import TempTakeError, raise_for_errors
+from service.temptake.loaders import load_module
+from service.temptake.requests import stream_request
+from util.json_stream import iter_json_array
+from util.statistics import get_entry_timestamp
+
+
+ENTRY_ENDPOINTS = {
+    PayloadIdentifier.MANAGER_IDENTIFIER: Endpoint.ENTRY_MANAGER,
+    PayloadIdentifier.WORKER_IDENTIFIER: Endpoint.ENTRY_WORKER,
+}
+
+
+# A naive datetime would be read as local time by some callers and as UTC by others, so it is refused
+def to_epoch(value: datetime) -> float:
+    if value.tzinfo is None:
+        raise ValueError(f"Naive datetime {value.isoformat()}, ranges must be timezone aware")
+    return value.timestamp()
+
+
+def to_iso(epoch: float) -> str:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat(timespec="seconds")
+
+
+# Entries of one module sorted by timestamp, complete between covered_from and covered_to
+class ModuleSeries:
+    def __init__(self):
+        self.timestamps = array("d")
+        self.entries: list[dict[str, Any]] = []
+        self.covered_from: float | None = None
+        self.covered_to: float | None = None
+        self.lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def clear(self) -> None:
+        self.timestamps = array("d")
+        self.entries = []
+        self.covered_from = self.covered_to = None
+
+    # The fetched window is authoritative, entries already cached inside it are replaced
+    def replace(self, start: float, end: float, timestamps: list[float], entries: list[dict[str, Any]]) -> None:
+        low = bisect_left(self.timestamps, start)
+        high = bisect_right(self.timestamps, end)
+        self.timestamps[low:high] = array("d", timestamps)
+        self.entries[low:high] = entries
+
+    def slice(self, start: float, end: float) -> list[dict[str, Any]]:
+        return self.entries[bisect_left(self.timestamps, start):bisect_right(self.timestamps, end)]
+
+    # Drop the oldest entries beyond the retention window or the point limit, returns the new coverage start
+    def trim(self, retention: float, max_points: int) -> float:
+        cutoff = self.covered_to - retention
+        if len(self.timestamps) > max_points:
+            cutoff = max(cutoff, self.timestamps[len(self.timestamps) - max_points])
+
+        dropped = bisect_left(self.timestamps, cutoff)
+        if dropped:
+            del self.timestamps[:dropped]
+            del self.entries[:dropped]
+        self.covered_from = max(self.covered_from, cutoff)
+        return self.covered_from
+
+
+async def sort_entries(entries: AsyncIterator[dict[str, Any]]) -> tuple[list[float], list[dict[str, Any]]]:
+    timestamped = []
+    async for entry in entries:
+        timestamp = get_entry_timestamp(entry)
+        if timestamp is not None:
+            timestamped.append((timestamp.timestamp(), entry))
+    timestamped.sort(key=lambda item: item[0])
+    return [timestamp for timestamp, _ in timestamped], [entry for _, entry in timestamped]
+
+
+# Keeps cached series across restarts
+class SeriesDatabase:
+    def __init__(self, path: str):
+        self._lock = ThreadLock()
+        self._connection = sqlite3.connect(path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS series_entries ("
+            "identifier TEXT NOT NULL, module_id INTEGER NOT NULL, timestamp REAL NOT NULL, entry TEXT NOT NULL)"
+        )
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS series_entries_module ON series_entries (identifier, module_id, timestamp)"
+        )
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS series_coverage ("
+            "identifier TEXT NOT NULL, module_id INTEGER NOT NULL, covered_from REAL NOT NULL, "
+            "covered_to REAL NOT NULL, PRIMARY KEY (identifier, module_id))"
+        )
+
+    def load(self, identifier: str, module_id: int) -> ModuleSeries | None:
+        with self._lock:
+            coverage = self._connection.execute(
+                "SELECT covered_from, covered_to FROM series_coverage WHERE identifier = ? AND module_id = ?",
+                (identifier, module_id)
+            ).fetchone()
+            if coverage is None:
+                return None
+            rows = self._connection.execute(
+                "SELECT timestamp, entry FROM series_entries WHERE identifier = ? AND module_id = ? "
+                "AND timestamp >= ? ORDER BY timestamp",
+                (identifier, module_id, coverage[0])
+            ).fetchall()
+
+        series = ModuleSeries()
+        series.covered_from, series.covered_to = coverage
+        series.timestamps = array("d", (timestamp for timestamp, _ in rows))
+        series.entries = [loads(entry) for _, entry in rows]
+        return series
+
+    def write(
+        self,
+        identifier: str,
+        module_id: int,
+        windows: list[tuple[float, float, list[float], list[dict[str, Any]]]],
+        covered_from: float,
+        covered_to: float,
+        reset: bool = False
+    ) -> None:
+        with self._lock:
+            self._connection.execute("BEGIN")
+            try:
+                if reset:
+                    self._connection.execute(
+                        "DELETE FROM series_entries WHERE identifier = ? AND module_id = ?", (identifier, module_id)
+                    )
+                for start, end, timestamps, entries in windows:
+                    self._connection.execute(
+                        "DELETE FROM series_entries WHERE identifier = ? AND module_id = ? "
+                        "AND timestamp >= ? AND timestamp <= ?",
+                        (identifier, module_id, start, end)
+                    )
+                    self._connection.executemany(
+                        "INSERT INTO series_entries VALUES (?, ?, ?, ?)",
+                        ((identifier, module_id, timestamp, dumps(entry)) for timestamp, entry in zip(timestamps, entries))
+                    )
+                self._connection.execute(
+                    "DELETE FROM series_entries WHERE identifier = ? AND module_id = ? AND timestamp < ?",
+                    (identifier, module_id, covered_from)
+                )
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO series_coverage VALUES (?, ?, ?, ?)",
+                    (identifier, module_id, covered_from, covered_to)
+                )
+                self._connection.execute("COMMIT")
+            except Exception:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+# Per-module entry cache that only asks TempTake for the part of a range it has not seen yet
+class SeriesCache:
+    def __init__(
+        self,
+        max_modules: int = SERIES_CACHE_SIZE,
+        max_points: int = SERIES_MAX_POINTS,
+        retention: float = SERIES_RETENTION,
+        settle: float = SERIES_SETTLE,
+        database: SeriesDatabase | None = None
+    ):
+        self.max_modules = max_modules
+        self.max_points = max_points
+        self.retention = retention
+        self.settle = settle
+        self.database = database
+        self._series: OrderedDict[tuple[str, int], ModuleSeries] = OrderedDict()
+        self.hits = 0
+        self.fetches = 0
+        self.passed_through = 0
+
+    async def _get_series(self, identifier: str, module_id: int) -> ModuleSeries:
+        key = (identifier, module_id)
+        series = self._series.get(key)
+        if series is None:
+            if self.database is not None:
+                series = await to_thread(self.database.load, identifier, module_id)
+            series = self._series.setdefault(key, series or ModuleSeries())
+        self._series.move_to_end(key)
+        while len(self._series) > self.max_modules:
+            self._series.popitem(last=False)
+        return series
+
+    # Entries of a range decoded one by one as the body arrives instead of buffering it whole
+    @asynccontextmanager
+    async def _open(
+        self, update: Update, identifier: PayloadIdentifier, module_id: int, start: float, end: float
+    ) -> AsyncIterator[AsyncIterator[dict[str, Any]]]:
+        self.fetches += 1
+        async with stream_request(
+            method=Method.GET,
+            endpoint=ENTRY_ENDPOINTS[identifier],
+            update=update,
+            json={
+                JsonIdentifier.ID_KEY.value: module_id,
+                JsonIdentifier.START_TIMESTAMP_KEY.value: to_iso(start),
+                JsonIdentifier.END_TIMESTAMP_KEY.value: to_iso(end)
+            }
+        ) as response:
+            if not response.is_success:
+                await response.aread()
+                raise TempTakeError(response)
+            yield iter_json_array(response.aiter_bytes())
+
+    async def _fetch(
+        self, update: Update, identifier: PayloadIdentifier, module_id: int, start: float, end: float
+    ) -> tuple[list[float], list[dict[str, Any]]]:
+        async with self._open(update, identifier, module_id, start, end) as entries:
+            return await sort_entries(entries)
+
+    # Entries of the module between start and end, raises TempTakeError when TempTake refuses a fetch
+    async def query(
+        self, update: Update, identifier: PayloadIdentifier, module_id: int, start: datetime, end: datetime
+    ) -> list[dict[str, Any]]:
+        start_epoch, end_epoch = to_epoch(start), to_epoch(end)
+        series = await self._get_series(identifier.value, module_id)
+
+        async with series.lock:
+            # A range that does not touch the cached one starts a new series instead of fetching the gap
+            reset = series.covered_from is not None and (
+                end_epoch < series.covered_from or start_epoch > series.covered_to
+            )
+            if reset:
+                series.clear()
+
+            # Entries close to the end of a range may still be arriving, so that part is fetched again next time.
+            # Nothing past the current time is settled, even when the range ends in the future.
+            settled_to = max(start_epoch, min(end_epoch, time()) - self.settle)
+            if series.covered_from is None:
+                windows = [(start_epoch, end_epoch)]
+                covered_from, covered_to = start_epoch, settled_to
+            else:
+                windows = []
+                if start_epoch < series.covered_from:
+                    windows.append((start_epoch, series.covered_from))
+                if end_epoch > series.covered_to:
+                    windows.append((series.covered_to, end_epoch))
+                covered_from = min(series.covered_from, start_epoch)
+                covered_to = max(series.covered_to, settled_to)
+
+            if not windows:
+                # Cached entries are shared between users, so check this user can see the module (cached per user)
+                self.hits += 1
+                raise_for_errors(await load_module(update, identifier, str(module_id)))
+                return series.slice(start_epoch, end_epoch)
+
+            results = await gather(*(
+                self._fetch(update, identifier, module_id, window_start, window_end)
+                for window_start, window_end in windows
+            ))
+
+            fetched = []
+            for (window_start, window_end), (timestamps, entries) in zip(windows, results):
+                series.replace(window_start, window_end, timestamps, entries)
+                fetched.append((window_start, window_end, timestamps, entries))
+            series.covered_from, series.covered_to = covered_from, covered_to
+
+            result = series.slice(start_epoch, end_epoch)
+            series.trim(self.retention, self.max_points)
+
+            if self.database is not None:
+                await to_thread(
+                    self.database.write,
+                    identifier.value, module_id, fetched, series.covered_from, series.covered_to, reset
+                )
+
+            return result
+
+    # Entries of the module between start and end one at a time, in no particular order.
+    # A range longer than the cache keeps is passed through from TempTake without being cached,
+    # so memory does not grow with the length of the range.
+    async def stream(
+        self, update: Update, identifier: PayloadIdentifier, module_id: int, start: datetime, end: datetime
+    ) -> AsyncIterator[dict[str, Any]]:
+        start_epoch, end_epoch = to_epoch(start), to_epoch(end)
+        if end_epoch - start_epoch <= self.retention:
+            for entry in await self.query(update, identifier, module_id, start, end):
+                yield entry
+            return
+
+        self.passed_through += 1
+        async with self._open(update, identifier, module_id, start_epoch, end_epoch) as entries:
+            async for entry in entries:
+                yield entry
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "modules": len(self._series),
+            "points": sum(len(series) for series in self._series.values()),
+            "hits": self.hits,
+            "fetches": self.fetches,
+            "passed_through": self.passed_through,
+        }
+
+    async def close(self) -> None:
+        if self.database is not None:
+            self.database.close()
+
+
+series_cache = SeriesCache(database=SeriesDatabase(SERIES_SQLITE_PATH) if SERIES_SQLITE_PATH else None)
+
+
+# Application post_shutdown hook
+async def close_series_cache(*_) -> None:
+    await series_cache.close()
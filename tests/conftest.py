@@ -0,0 +1,7 @@
+from os import environ
+
+# Must be set before config is imported
+environ.setdefault("INTERNAL_SECRET", "test-secret")
+environ.setdefault("TELEGRAM_BOT_TOKEN", "1:test")
+environ.setdefault("SERVER_HOST", "temptake")
+environ.setdefault("SERVER_PORT", "80")
@@ -0,0 +1,56 @@
+from asyncio import CancelledError, create_task, gather, run, sleep, wait_for
+
+from service.telegram.dispatcher import OutboundDispatcher
+
+
+def test_coalesced_edits_all_return_the_newest_result():
+    async def scenario():
+        dispatcher = OutboundDispatcher(global_rate=1000, global_burst=1, chat_rate=5, chat_burst=1)
+        await dispatcher.initialize()
+        sent = []
+
+        async def edit(text):
+            sent.append(text)
+            return text
+
+        async def send(text):
+            return await dispatcher.process_request(
+                edit, (text,), {}, "editMessageText", {"chat_id": 1}, {"coalesce": "message"}
+            )
+
+        try:
+            # The first edit takes the only token, the rest wait and replace each other
+            first = await send("m0")
+            results = await wait_for(gather(*(send(f"m{index}") for index in range(1, 5))), 5)
+        finally:
+            await dispatcher.shutdown()
+        return first, results, sent, dispatcher.coalesced
+
+    first, results, sent, coalesced = run(scenario())
+    assert first == "m0"
+    assert results == ["m4"] * 4
+    assert sent == ["m0", "m4"]
+    assert coalesced == 3
+
+
+def test_shutdown_releases_replaced_requests():
+    async def scenario():
+        dispatcher = OutboundDispatcher(global_rate=1000, global_burst=1, chat_rate=0.01, chat_burst=1)
+        await dispatcher.initialize()
+
+        async def edit(text):
+            return text
+
+        async def send(text):
+            return await dispatcher.process_request(
+                edit, (text,), {}, "editMessageText", {"chat_id": 1}, {"coalesce": "message"}
+            )
+
+        await send("m0")
+        tasks = [create_task(send(f"m{index}")) for index in range(1, 4)]
+        await sleep(0.05)
+        await dispatcher.shutdown()
+        return await wait_for(gather(*tasks, return_exceptions=True), 5)
+
+    results = run(scenario())
+    assert all(isinstance(result, CancelledError) for result in results)
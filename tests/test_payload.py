@@ -0,0 +1,71 @@
+from itertools import product
+
+import pytest
+
+from enums.ButtonAction import ButtonAction
+from enums.PayloadIdentifier import PayloadIdentifier, IDENTIFIER_DELIMITER
+from util.payload import MAX_CALLBACK_DATA, PayloadExpiredError, PayloadTable, create_payload, split_payload
+
+# Largest id of a 64-bit signed database column
+LONGEST_ID = str(2 ** 63 - 1)
+
+IDS = ["0", "7", LONGEST_ID, "007", "-12", "AA:BB:CC:DD:EE:FF", "x" * 200]
+COMBINATIONS = list(product(PayloadIdentifier, ButtonAction, IDS))
+
+
+@pytest.mark.parametrize("identifier, action, obj_id", COMBINATIONS)
+def test_action_round_trip(identifier, action, obj_id):
+    callback_data = create_payload(identifier, obj_id, action)
+
+    assert len(callback_data.encode()) <= MAX_CALLBACK_DATA
+    assert split_payload(callback_data) == (identifier, obj_id, action)
+
+
+@pytest.mark.parametrize("identifier, obj_id", list(product(PayloadIdentifier, IDS)))
+@pytest.mark.parametrize("name", ["Greenhouse", "Ünïcødé group", "g" * 200])
+def test_name_round_trip(identifier, obj_id, name):
+    callback_data = create_payload(identifier, obj_id, name)
+
+    assert len(callback_data.encode()) <= MAX_CALLBACK_DATA
+    assert split_payload(callback_data) == (identifier, obj_id, name)
+
+
+def test_longest_inline_payload_fits_without_the_table():
+    callback_data = create_payload(PayloadIdentifier.SUBSCRIPTION_IDENTIFIER, LONGEST_ID, ButtonAction.DASHBOARD)
+
+    # A token is a marker byte, the nonce and a varint, anything longer was encoded inline
+    assert len(callback_data) > 8
+    assert len(callback_data) <= MAX_CALLBACK_DATA
+
+
+def test_delimited_payload_of_old_buttons():
+    payload = IDENTIFIER_DELIMITER.join(["g", "12", "select"])
+
+    assert split_payload(payload) == (PayloadIdentifier.GROUP_IDENTIFIER, "12", ButtonAction.SELECT)
+
+
+def test_evicted_token_expires():
+    table = PayloadTable(max_size=1)
+    first = table.store((PayloadIdentifier.GROUP_IDENTIFIER, "1", "first"))
+    table.store((PayloadIdentifier.GROUP_IDENTIFIER, "2", "second"))
+
+    with pytest.raises(PayloadExpiredError):
+        table.resolve(first)
+
+
+def test_rendering_a_button_again_reuses_its_token():
+    table = PayloadTable(max_size=2)
+    first = table.store((PayloadIdentifier.GROUP_IDENTIFIER, "1", "first"))
+    second = table.store((PayloadIdentifier.GROUP_IDENTIFIER, "2", "second"))
+
+    for _ in range(5):
+        assert table.store((PayloadIdentifier.GROUP_IDENTIFIER, "1", "first")) == first
+
+    assert table.resolve(first) == (PayloadIdentifier.GROUP_IDENTIFIER, "1", "first")
+    assert table.resolve(second) == (PayloadIdentifier.GROUP_IDENTIFIER, "2", "second")
+
+
+@pytest.mark.parametrize("callback_data", ["", "!!!", "AA", "_w", "bQ", "x\ny"])
+def test_garbage_is_rejected(callback_data):
+    with pytest.raises(ValueError):
+        split_payload(callback_data)
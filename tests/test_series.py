@@ -0,0 +1,94 @@
+from asyncio import run
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from enums.PayloadIdentifier import PayloadIdentifier
+from service.temptake import series as series_module
+from service.temptake.series import SeriesCache, to_epoch
+
+WORKER = PayloadIdentifier.WORKER_IDENTIFIER
+
+
+# Serves the entries of a list that grows between queries, like TempTake receiving new readings
+class FakeTempTake:
+    def __init__(self):
+        self.entries = []
+        self.windows = []
+
+    def add(self, timestamp: datetime, value: float) -> None:
+        self.entries.append({"workerId": 7, "timestamp": timestamp.isoformat(), "temperature": value})
+
+    @asynccontextmanager
+    async def open(self, update, identifier, module_id, start, end):
+        self.windows.append((start, end))
+
+        async def entries():
+            for entry in self.entries:
+                if start <= to_epoch(datetime.fromisoformat(entry["timestamp"])) <= end:
+                    yield entry
+
+        yield entries()
+
+
+@pytest.fixture
+def temptake(monkeypatch):
+    fake = FakeTempTake()
+
+    async def load_module(update, identifier, module_id):
+        class Response:
+            is_success = True
+        return Response()
+
+    monkeypatch.setattr(series_module, "load_module", load_module)
+    return fake
+
+
+def make_cache(temptake: FakeTempTake) -> SeriesCache:
+    cache = SeriesCache(settle=120)
+    cache._open = temptake.open
+    return cache
+
+
+def temperatures(entries):
+    return [entry["temperature"] for entry in entries]
+
+
+def test_entries_arriving_after_a_query_are_returned_by_the_next_one(temptake):
+    cache = make_cache(temptake)
+    now = datetime.now(timezone.utc)
+    temptake.add(now - timedelta(hours=2), 1)
+    temptake.add(now - timedelta(minutes=1), 2)
+
+    async def scenario():
+        first = await cache.query(None, WORKER, 7, now - timedelta(days=1), now)
+        # Readings reach TempTake late, the newest one is from before the first query ended
+        temptake.add(now - timedelta(seconds=30), 3)
+        second = await cache.query(None, WORKER, 7, now - timedelta(days=1), now + timedelta(seconds=5))
+        return first, second
+
+    first, second = run(scenario())
+
+    assert temperatures(first) == [1, 2]
+    assert temperatures(second) == [1, 2, 3]
+
+
+def test_a_range_ending_in_the_future_is_not_settled_past_now(temptake):
+    cache = make_cache(temptake)
+    now = datetime.now(timezone.utc)
+    temptake.add(now - timedelta(hours=1), 1)
+
+    async def scenario():
+        await cache.query(None, WORKER, 7, now - timedelta(days=1), now + timedelta(hours=3))
+        temptake.add(now + timedelta(minutes=30), 2)
+        return await cache.query(None, WORKER, 7, now - timedelta(days=1), now + timedelta(hours=3))
+
+    entries = run(scenario())
+
+    assert temperatures(entries) == [1, 2]
+
+
+def test_naive_datetimes_are_refused():
+    with pytest.raises(ValueError):
+        to_epoch(datetime(2026, 1, 1))
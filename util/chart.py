@@ -0,0 +1,106 @@
+from struct import pack
+from zlib import compress, crc32
+
+
+BACKGROUND = (255, 255, 255)
+GRID = (225, 225, 225)
+AXIS = (120, 120, 120)
+SERIES_COLORS = [(220, 50, 47), (38, 139, 210), (133, 153, 0), (211, 54, 130)]
+
+
+class Canvas:
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        self.pixels = bytearray(BACKGROUND * width * height)
+
+    def set_pixel(self, x: int, y: int, color: tuple[int, int, int]) -> None:
+        if 0 <= x < self.width and 0 <= y < self.height:
+            offset = (y * self.width + x) * 3
+            self.pixels[offset:offset + 3] = bytes(color)
+
+    # Bresenham line, thickened by one pixel so it stays visible after Telegram recompression
+    def line(self, x0: int, y0: int, x1: int, y1: int, color: tuple[int, int, int], thick: bool = False) -> None:
+        dx, dy = abs(x1 - x0), -abs(y1 - y0)
+        sx, sy = (1 if x0 < x1 else -1), (1 if y0 < y1 else -1)
+        error = dx + dy
+
+        while True:
+            self.set_pixel(x0, y0, color)
+            if thick:
+                self.set_pixel(x0, y0 + 1, color)
+                self.set_pixel(x0 + 1, y0, color)
+            if x0 == x1 and y0 == y1:
+                return
+            double_error = 2 * error
+            if double_error >= dy:
+                error += dy
+                x0 += sx
+            if double_error <= dx:
+                error += dx
+                y0 += sy
+
+    def to_png(self) -> bytes:
+        row_size = self.width * 3
+        raw = b"".join(
+            b"\x00" + self.pixels[row * row_size:(row + 1) * row_size] for row in range(self.height)
+        )
+
+        def chunk(kind: bytes, data: bytes) -> bytes:
+            return pack(">I", len(data)) + kind + data + pack(">I", crc32(kind + data) & 0xFFFFFFFF)
+
+        return (
+            b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", compress(raw, 6))
+            + chunk(b"IEND", b"")
+        )
+
+
+# Render each series as a line scaled to its own value range, returns PNG bytes
+def render_chart(
+    series: dict[str, list[tuple[float, float]]],
+    start: float,
+    end: float,
+    width: int = 800,
+    height: int = 400,
+    margin: int = 20,
+    grid_lines: int = 4
+) -> bytes:
+    canvas = Canvas(width, height)
+    plot_width = width - 2 * margin
+    plot_height = height - 2 * margin
+
+    for line in range(grid_lines + 1):
+        y = margin + round(plot_height * line / grid_lines)
+        canvas.line(margin, y, width - margin, y, GRID)
+    canvas.line(margin, margin, margin, height - margin, AXIS)
+    canvas.line(margin, height - margin, width - margin, height - margin, AXIS)
+
+    span = (end - start) or 1.0
+    for index, points in enumerate(series.values()):
+        if not points:
+            continue
+
+        low = min(value for _, value in points)
+        high = max(value for _, value in points)
+        value_span = (high - low) or 1.0
+        color = SERIES_COLORS[index % len(SERIES_COLORS)]
+
+        scaled = [
+            (
+                margin + round(plot_width * (timestamp - start) / span),
+                height - margin - round(plot_height * (value - low) / value_span)
+            )
+            for timestamp, value in points
+        ]
+        for (x0, y0), (x1, y1) in zip(scaled, scaled[1:]):
+            canvas.line(x0, y0, x1, y1, color, thick=True)
+        if len(scaled) == 1:
+            canvas.set_pixel(*scaled[0], color)
+
+    return canvas.to_png()
+
+
+def color_name(index: int) -> str:
+    return ["red", "blue", "green", "magenta"][index % len(SERIES_COLORS)]
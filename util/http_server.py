@@ -0,0 +1,122 @@
+from asyncio import StreamReader, StreamWriter, Task, current_task, start_server, wait, wait_for, Server
+from http import HTTPStatus
+from logging import getLogger
+from typing import Awaitable, Callable, NamedTuple
+from urllib.parse import urlsplit, parse_qs
+
+from config import HTTP_SERVER_MAX_BODY, HTTP_SERVER_SHUTDOWN_TIMEOUT
+
+
+class HttpRequest(NamedTuple):
+    method: str
+    path: str
+    query: dict[str, list[str]]
+    headers: dict[str, str]
+    body: bytes
+
+
+class HttpResponse(NamedTuple):
+    status: int = 200
+    body: bytes = b""
+    content_type: str = "text/plain; charset=utf-8"
+
+
+logger = getLogger(__name__)
+
+HttpHandler = Callable[[HttpRequest], Awaitable[HttpResponse]]
+
+
+# Minimal asyncio HTTP/1.1 server for the bot's internal endpoints, one request per connection
+class HttpServer:
+    def __init__(self, host: str, port: int, max_body_size: int = HTTP_SERVER_MAX_BODY, read_timeout: float = 10):
+        self.host = host
+        self.port = port
+        self.max_body_size = max_body_size
+        self.read_timeout = read_timeout
+        self._routes: dict[tuple[str, str], HttpHandler] = {}
+        self._server: Server | None = None
+        self._connections: set[Task] = set()
+
+    def route(self, method: str, path: str, handler: HttpHandler) -> 'HttpServer':
+        self._routes[(method.upper(), path)] = handler
+        return self
+
+    async def start(self) -> None:
+        self._server = await start_server(self._handle_connection, self.host, self.port)
+        if self.port == 0:
+            self.port = self._server.sockets[0].getsockname()[1]
+
+    # Stop accepting connections and let in-flight requests finish
+    async def stop(self, timeout: float = HTTP_SERVER_SHUTDOWN_TIMEOUT) -> None:
+        if self._server is None:
+            return
+
+        self._server.close()
+        if self._connections:
+            _, pending = await wait(self._connections, timeout=timeout)
+            for task in pending:
+                task.cancel()
+        self._server = None
+
+    async def _read_request(self, reader: StreamReader) -> HttpRequest | HttpResponse:
+        request_line = (await reader.readline()).decode("latin-1").strip()
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            return HttpResponse(HTTPStatus.BAD_REQUEST)
+
+        headers = {}
+        while (line := (await reader.readline()).decode("latin-1").strip()):
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0))
+        except ValueError:
+            return HttpResponse(HTTPStatus.BAD_REQUEST)
+        if length < 0:
+            return HttpResponse(HTTPStatus.BAD_REQUEST)
+        if length > self.max_body_size:
+            return HttpResponse(HTTPStatus.REQUEST_ENTITY_TOO_LARGE)
+
+        body = await reader.readexactly(length) if length else b""
+        url = urlsplit(target)
+        return HttpRequest(method.upper(), url.path, parse_qs(url.query), headers, body)
+
+    async def _dispatch(self, reader: StreamReader) -> HttpResponse:
+        request = await wait_for(self._read_request(reader), self.read_timeout)
+        if isinstance(request, HttpResponse):
+            return request
+
+        handler = self._routes.get((request.method, request.path))
+        if handler is None:
+            allowed = any(path == request.path for _, path in self._routes)
+            return HttpResponse(HTTPStatus.METHOD_NOT_ALLOWED if allowed else HTTPStatus.NOT_FOUND)
+
+        return await handler(request)
+
+    async def _handle_connection(self, reader: StreamReader, writer: StreamWriter) -> None:
+        task = current_task()
+        self._connections.add(task)
+        try:
+            try:
+                response = await self._dispatch(reader)
+            except (TimeoutError, ConnectionError, EOFError):
+                response = HttpResponse(HTTPStatus.BAD_REQUEST)
+            except Exception:
+                logger.exception("Unhandled error while serving an HTTP request")
+                response = HttpResponse(HTTPStatus.INTERNAL_SERVER_ERROR)
+
+            status = HTTPStatus(response.status)
+            writer.write(
+                f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                f"Content-Type: {response.content_type}\r\n"
+                f"Content-Length: {len(response.body)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + response.body
+            )
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+            self._connections.discard(task)
@@ -0,0 +1,83 @@
+from codecs import getincrementaldecoder
+from json import JSONDecodeError, JSONDecoder
+from typing import Any, AsyncIterator
+
+WHITESPACE = " \t\n\r"
+
+# Consumed text is cut off the buffer once this much of it piled up
+COMPACT_THRESHOLD = 64 * 1024
+
+_decoder = JSONDecoder()
+
+
+# Yield the items of a top level JSON array as soon as each one is complete,
+# so only a single item and one chunk are held in memory at a time.
+# A document that is not an array is yielded whole.
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Any]:
+    text_decoder = getincrementaldecoder("utf-8")()
+    buffer = ""
+    position = 0
+    started = False
+    finished = False
+    exhausted = False
+
+    while not finished:
+        while position < len(buffer) and buffer[position] in WHITESPACE:
+            position += 1
+
+        if position < len(buffer):
+            if not started:
+                if buffer[position] != "[":
+                    # Not an array, wait for the whole document
+                    if not exhausted:
+                        buffer, position, exhausted = await _read(chunks, text_decoder, buffer, position)
+                        continue
+                    yield _decoder.decode(buffer[position:])
+                    return
+                started = True
+                position += 1
+                continue
+
+            if buffer[position] == "]":
+                finished = True
+                continue
+
+            if buffer[position] == ",":
+                position += 1
+                continue
+
+            try:
+                item, end = _decoder.raw_decode(buffer, position)
+            except JSONDecodeError:
+                if exhausted:
+                    raise
+            else:
+                # A number may continue in the next chunk, so an item counts once the delimiter after it arrived
+                delimiter = end
+                while delimiter < len(buffer) and buffer[delimiter] in WHITESPACE:
+                    delimiter += 1
+                if delimiter < len(buffer) and buffer[delimiter] in ",]":
+                    position = end
+                    yield item
+                    continue
+                if exhausted:
+                    raise JSONDecodeError("Expecting ',' delimiter", buffer, delimiter)
+
+        if exhausted:
+            if not finished:
+                raise JSONDecodeError("Unterminated array", buffer, position)
+            break
+
+        buffer, position, exhausted = await _read(chunks, text_decoder, buffer, position)
+
+
+async def _read(chunks: AsyncIterator[bytes], text_decoder, buffer: str, position: int) -> tuple[str, int, bool]:
+    if position >= COMPACT_THRESHOLD:
+        buffer, position = buffer[position:], 0
+
+    try:
+        chunk = await anext(chunks)
+    except StopAsyncIteration:
+        return buffer + text_decoder.decode(b"", final=True), position, True
+
+    return buffer + text_decoder.decode(chunk), position, False
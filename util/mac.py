@@ -0,0 +1,55 @@
+from csv import reader
+from re import compile as compile_regex
+from typing import NamedTuple
+
+# MACs may be pasted one per line or separated by commas, semicolons or spaces
+SEPARATORS = compile_regex(r"[\s,;]+")
+MAC_DIGITS = compile_regex(r"[0-9A-F]{12}")
+MAC_HEADER = "mac"
+
+
+class MacList(NamedTuple):
+    valid: list[str]
+    invalid: list[str]
+    duplicates: int
+
+
+# Accepts AA:BB:CC:DD:EE:FF, AA-BB-CC-DD-EE-FF, AABB.CCDD.EEFF and AABBCCDDEEFF in any case
+def normalize_mac(value: str) -> str | None:
+    digits = value.strip().strip("\"'").upper().replace(":", "").replace("-", "").replace(".", "")
+    if not MAC_DIGITS.fullmatch(digits):
+        return None
+    return ":".join(digits[index:index + 2] for index in range(0, 12, 2))
+
+
+# A CSV with a "mac" column contributes that column only, anything else is read as a plain list
+def extract_mac_tokens(text: str) -> list[str]:
+    lines = text.splitlines()
+    if lines:
+        delimiter = ";" if ";" in lines[0] else ","
+        rows = list(reader(lines, delimiter=delimiter))
+        header = [cell.strip().lower() for cell in rows[0]] if rows else []
+        if MAC_HEADER in header:
+            column = header.index(MAC_HEADER)
+            return [row[column].strip() for row in rows[1:] if len(row) > column and row[column].strip()]
+
+    return [token for token in SEPARATORS.split(text) if token]
+
+
+def parse_mac_list(text: str) -> MacList:
+    valid: list[str] = []
+    invalid: list[str] = []
+    seen: set[str] = set()
+    duplicates = 0
+
+    for token in extract_mac_tokens(text):
+        mac = normalize_mac(token)
+        if mac is None:
+            invalid.append(token)
+        elif mac in seen:
+            duplicates += 1
+        else:
+            seen.add(mac)
+            valid.append(mac)
+
+    return MacList(valid, invalid, duplicates)
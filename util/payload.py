@@ -1,20 +1,174 @@
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from binascii import Error as Base64Error
+from collections import OrderedDict
+from itertools import count
+from os import urandom
+
+from config import PAYLOAD_TABLE_SIZE
 from enums.ButtonAction import ButtonAction
 from enums.PayloadIdentifier import *
 
 
+# Telegram's limit for callback_data
+MAX_CALLBACK_DATA = 64
+
+# Stable wire codes, new actions must get new codes so buttons already sent keep working
+ACTION_CODES = {
+    ButtonAction.ADD: 1,
+    ButtonAction.DAY: 2,
+    ButtonAction.SELECT: 3,
+    ButtonAction.LAST: 4,
+    ButtonAction.DELETE: 5,
+    ButtonAction.CHART: 6,
+    ButtonAction.ALERT: 7,
+    ButtonAction.EXPORT: 8,
+    ButtonAction.DASHBOARD: 9,
+}
+ACTIONS_BY_CODE = {code: action for action, code in ACTION_CODES.items()}
+IDENTIFIERS_BY_CODE = {ord(identifier.value): identifier for identifier in PayloadIdentifier}
+
+TEXT_NAME = 0
+ACTION_MASK = 0x1F
+INT_ID_FLAG = 0x20
+TOKEN_MARKER = 0
+
+Payload = tuple[PayloadIdentifier, str, ButtonAction | str]
+
+
+class PayloadExpiredError(ValueError):
+    pass
+
+
+def write_varint(value: int, buffer: bytearray) -> None:
+    while value > 0x7F:
+        buffer.append(value & 0x7F | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+def read_varint(data: bytes, offset: int) -> tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def is_int_id(obj_id: str) -> bool:
+    return obj_id.isdecimal() and obj_id.isascii() and (obj_id == "0" or not obj_id.startswith("0"))
+
+
+# Bounded LRU table for payloads too long to travel in callback_data
+class PayloadTable:
+    def __init__(self, max_size: int = PAYLOAD_TABLE_SIZE):
+        self.max_size = max_size
+        # Tokens from a previous process must never resolve to this process' payloads
+        self.nonce = urandom(2)
+        self._counter = count()
+        self._payloads: OrderedDict[int, Payload] = OrderedDict()
+        # A menu rendered again reuses the tokens of its buttons instead of evicting live ones
+        self._keys: dict[Payload, int] = {}
+
+    def store(self, payload: Payload) -> bytes:
+        key = self._keys.get(payload)
+        if key is None:
+            key = next(self._counter)
+            self._payloads[key] = payload
+            self._keys[payload] = key
+            while len(self._payloads) > self.max_size:
+                _, evicted = self._payloads.popitem(last=False)
+                del self._keys[evicted]
+        else:
+            self._payloads.move_to_end(key)
+
+        token = bytearray([TOKEN_MARKER])
+        token += self.nonce
+        write_varint(key, token)
+        return bytes(token)
+
+    def resolve(self, data: bytes) -> Payload:
+        if data[1:3] != self.nonce:
+            raise PayloadExpiredError(data)
+        key, _ = read_varint(data, 3)
+        payload = self._payloads.get(key)
+        if payload is None:
+            raise PayloadExpiredError(data)
+        self._payloads.move_to_end(key)
+        return payload
+
+
+payload_table = PayloadTable()
+
+
+def encode_payload(identifier: PayloadIdentifier, obj_id: str, button_action: ButtonAction | str) -> bytes:
+    action_code = ACTION_CODES[button_action] if isinstance(button_action, ButtonAction) else TEXT_NAME
+    int_id = is_int_id(obj_id)
+
+    data = bytearray([ord(identifier.value), action_code | (INT_ID_FLAG if int_id else 0)])
+    if int_id:
+        write_varint(int(obj_id), data)
+    else:
+        encoded_id = obj_id.encode()
+        write_varint(len(encoded_id), data)
+        data += encoded_id
+    if action_code == TEXT_NAME:
+        data += button_action.encode()
+    return bytes(data)
+
+
+def decode_payload(data: bytes) -> Payload:
+    if data[0] == TOKEN_MARKER:
+        return payload_table.resolve(data)
+
+    identifier = IDENTIFIERS_BY_CODE[data[0]]
+    action_code = data[1] & ACTION_MASK
+
+    if data[1] & INT_ID_FLAG:
+        obj_id, offset = read_varint(data, 2)
+        obj_id = str(obj_id)
+    else:
+        length, offset = read_varint(data, 2)
+        obj_id = data[offset:offset + length].decode()
+        offset += length
+
+    if action_code == TEXT_NAME:
+        return identifier, obj_id, data[offset:].decode()
+    return identifier, obj_id, ACTIONS_BY_CODE[action_code]
+
+
+def to_callback_data(data: bytes) -> str:
+    return urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
 # Split the payload into its components
-def split_payload(payload: str) -> tuple[PayloadIdentifier, str, ButtonAction | str]:
-    payload_identifier, obj_id, obj_name = payload.split(IDENTIFIER_DELIMITER, 2)
+def split_payload(payload: str) -> Payload:
+    # Buttons sent before the compact format still carry the delimited text payload
+    if IDENTIFIER_DELIMITER in payload:
+        payload_identifier, obj_id, obj_name = payload.split(IDENTIFIER_DELIMITER, 2)
 
-    try:
-        button_action = ButtonAction(obj_name)
-    except ValueError:
-        button_action = obj_name
+        try:
+            button_action = ButtonAction(obj_name)
+        except ValueError:
+            button_action = obj_name
+
+        return PayloadIdentifier(payload_identifier), obj_id, button_action
 
-    return PayloadIdentifier(payload_identifier), obj_id, button_action
+    try:
+        data = urlsafe_b64decode(payload + "=" * (-len(payload) % 4))
+        return decode_payload(data)
+    except PayloadExpiredError:
+        raise
+    except (Base64Error, IndexError, KeyError, UnicodeDecodeError) as error:
+        raise ValueError(f"Invalid payload {payload!r}") from error
 
 
 def create_payload(identifier: PayloadIdentifier, obj_id: str, button_action: ButtonAction | str) -> str:
-    if isinstance(button_action, ButtonAction):
-        button_action = button_action.value
-    return f"{identifier.value}{IDENTIFIER_DELIMITER}{obj_id}{IDENTIFIER_DELIMITER}{button_action}"
+    obj_id = str(obj_id)
+    callback_data = to_callback_data(encode_payload(identifier, obj_id, button_action))
+    if len(callback_data) <= MAX_CALLBACK_DATA:
+        return callback_data
+
+    return to_callback_data(payload_table.store((identifier, obj_id, button_action)))
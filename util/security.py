@@ -1,17 +1,71 @@
+from collections import OrderedDict
 from datetime import datetime, timezone
-from jwt import encode
+from jwt import encode, decode, InvalidTokenError
 from telegram import Update
 
 from enums.JsonIdentifier import *
-from config import INTERNAL_SECRET, TOKEN_EXPIRATION
+from config import INTERNAL_SECRET, TOKEN_EXPIRATION, TOKEN_CACHE_SIZE, TOKEN_REFRESH_MARGIN
 
 
-# Generate a JWT token for the user
+# LRU cache of signed tokens keyed by the user credentials
+class TokenCache:
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._tokens: OrderedDict[tuple[str, str], tuple[str, datetime]] = OrderedDict()
+
+    def get(self, key: tuple[str, str], now: datetime) -> str | None:
+        cached = self._tokens.get(key)
+        if cached is None or cached[1] - TOKEN_REFRESH_MARGIN <= now:
+            self._tokens.pop(key, None)
+            self.misses += 1
+            return None
+
+        self._tokens.move_to_end(key)
+        self.hits += 1
+        return cached[0]
+
+    def put(self, key: tuple[str, str], token: str, expires_at: datetime, now: datetime) -> None:
+        self._tokens[key] = (token, expires_at)
+        self._tokens.move_to_end(key)
+
+        if len(self._tokens) > self.max_size:
+            self.evict_expired(now)
+        while len(self._tokens) > self.max_size:
+            self._tokens.popitem(last=False)
+
+    def evict_expired(self, now: datetime) -> None:
+        for key in [key for key, (_, expires_at) in self._tokens.items() if expires_at - TOKEN_REFRESH_MARGIN <= now]:
+            del self._tokens[key]
+
+    def clear(self) -> None:
+        self._tokens.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"size": len(self._tokens), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache()
+
+
+# Generate a JWT token for the user, reusing a cached one until shortly before it expires
 def generate_jwt(user_credentials: dict[str, str]) -> str:
+    key = (
+        user_credentials[JsonIdentifier.TELEGRAM_ID_KEY.value],
+        user_credentials[JsonIdentifier.TELEGRAM_USERNAME_KEY.value],
+    )
+    now = datetime.now(timezone.utc)
+
+    token = token_cache.get(key, now)
+    if token is not None:
+        return token
+
+    expires_at = now + TOKEN_EXPIRATION
     payload = {
-        "TelegramId": user_credentials[JsonIdentifier.TELEGRAM_ID_KEY.value],
-        "TelegramUsername": user_credentials[JsonIdentifier.TELEGRAM_USERNAME_KEY.value],
-        "exp": datetime.now(timezone.utc) + TOKEN_EXPIRATION,
+        "TelegramId": key[0],
+        "TelegramUsername": key[1],
+        "exp": expires_at,
     }
 
     token = encode(
@@ -20,9 +74,24 @@ def generate_jwt(user_credentials: dict[str, str]) -> str:
         algorithm="HS256"
     )
 
+    token_cache.put(key, token, expires_at, now)
     return token
 
 
+# Verify a token signed by the TempTake server with the shared secret for the given audience
+def verify_internal_jwt(token: str, audience: str) -> dict | None:
+    try:
+        return decode(
+            jwt=token,
+            key=INTERNAL_SECRET,
+            algorithms=["HS256"],
+            audience=audience,
+            options={"require": ["exp", "aud"]}
+        )
+    except InvalidTokenError:
+        return None
+
+
 # Get user credentials from the update object
 def get_user_credentials(update: Update) -> dict[str, str]:
     return {
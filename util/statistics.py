@@ -0,0 +1,276 @@
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from math import floor, inf, isfinite
+from typing import Any, AsyncIterator, Iterable, NamedTuple
+
+from enums.JsonIdentifier import JsonIdentifier
+
+
+PERCENTILES = (50, 90, 95)
+DOWNSAMPLE_POINTS = 12
+# Percentiles are taken from values counted at this resolution, finer than the one decimal summaries show
+HISTOGRAM_RESOLUTION = 0.01
+# Raw points each bucket keeps of every metric for the trend
+TREND_POINTS_PER_BUCKET = 64
+
+
+class MetricStats(NamedTuple):
+    count: int
+    min: float
+    max: float
+    mean: float
+    percentiles: dict[int, float]
+
+
+class BucketStats(NamedTuple):
+    start: datetime
+    metrics: dict[str, MetricStats]
+
+
+class SeriesSummary(NamedTuple):
+    count: int
+    metrics: dict[str, MetricStats]
+    buckets: list[BucketStats]
+    downsampled: dict[str, list[tuple[datetime, float]]]
+
+
+def parse_timestamp(value: str) -> datetime:
+    timestamp = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return timestamp
+
+
+def get_entry_timestamp(entry: dict[str, Any]) -> datetime | None:
+    value = entry.get(JsonIdentifier.TIMESTAMP_KEY.value, entry.get(JsonIdentifier.CREATED_AT_KEY.value))
+    return None if value is None else parse_timestamp(value)
+
+
+# Any numeric field that is not an identifier is treated as a metric
+def is_metric(key: str, value: Any) -> bool:
+    return (
+        isinstance(value, (int, float))
+        and not isinstance(value, bool)
+        and key != JsonIdentifier.ID_KEY.value
+        and not key.endswith("Id")
+    )
+
+
+# Split entries into a timestamp column and one column per metric
+def to_columns(entries: Iterable[dict[str, Any]]) -> tuple[list[float], dict[str, list[float]]]:
+    timestamps: list[float] = []
+    metrics: dict[str, list[float]] = {}
+
+    for entry in entries:
+        timestamp = get_entry_timestamp(entry)
+        if timestamp is None:
+            continue
+
+        index = len(timestamps)
+        timestamps.append(timestamp.timestamp())
+        for key, value in entry.items():
+            if is_metric(key, value):
+                column = metrics.setdefault(key, [])
+                column.extend([float("nan")] * (index - len(column)))
+                column.append(float(value))
+
+    for column in metrics.values():
+        column.extend([float("nan")] * (len(timestamps) - len(column)))
+
+    return timestamps, metrics
+
+
+# Largest-Triangle-Three-Buckets downsampling, keeps the visual shape of the series
+def lttb(points: list[tuple[float, float]], threshold: int) -> list[tuple[float, float]]:
+    if threshold >= len(points) or threshold < 3:
+        return points
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (threshold - 2)
+    selected = 0
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+        next_points = points[next_start:next_end] or [points[-1]]
+        average_x = sum(point[0] for point in next_points) / len(next_points)
+        average_y = sum(point[1] for point in next_points) / len(next_points)
+
+        selected_x, selected_y = points[selected]
+        best_area = -1.0
+        best_index = start
+        for index in range(start, end):
+            x, y = points[index]
+            area = abs((selected_x - average_x) * (y - selected_y) - (selected_x - x) * (average_y - selected_y))
+            if area > best_area:
+                best_area = area
+                best_index = index
+
+        sampled.append(points[best_index])
+        selected = best_index
+
+    sampled.append(points[-1])
+    return sampled
+
+
+# Running statistics of one metric, percentiles come from a histogram of the values.
+# Sensor readings repeat a small set of values, so the histogram stays small however many entries are added.
+# An evenly spread sample of at most max_points raw points is kept for the trend:
+# when it is full every other point is dropped and from then on only every other new point is kept.
+class MetricAccumulator:
+    def __init__(self, max_points: int = TREND_POINTS_PER_BUCKET):
+        self.count = 0
+        self.total = 0.0
+        self.min = inf
+        self.max = -inf
+        self.histogram: Counter[int] = Counter()
+        self.max_points = max_points
+        self.points: list[tuple[float, float]] = []
+        self.stride = 1
+
+    def add(self, value: float, timestamp: float) -> None:
+        if self.max_points and self.count % self.stride == 0:
+            self.points.append((timestamp, value))
+            if len(self.points) > self.max_points:
+                del self.points[1::2]
+                self.stride *= 2
+
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        self.histogram[round(value / HISTOGRAM_RESOLUTION)] += 1
+
+    # Linear interpolation between the closest ranks
+    def percentiles(self) -> dict[int, float]:
+        if not self.histogram:
+            return {}
+
+        ranks = {}
+        for percent in PERCENTILES:
+            position = (self.count - 1) * percent / 100
+            lower = floor(position)
+            ranks[percent] = (lower, min(lower + 1, self.count - 1), position - lower)
+
+        wanted = sorted({rank for lower, upper, _ in ranks.values() for rank in (lower, upper)})
+        values = {}
+        seen = 0
+        for bucket, count in sorted(self.histogram.items()):
+            seen += count
+            while wanted and wanted[0] < seen:
+                values[wanted.pop(0)] = bucket * HISTOGRAM_RESOLUTION
+            if not wanted:
+                break
+
+        return {
+            percent: values[lower] + (values[upper] - values[lower]) * fraction
+            for percent, (lower, upper, fraction) in ranks.items()
+        }
+
+    def stats(self) -> MetricStats:
+        return MetricStats(
+            count=self.count,
+            min=self.min,
+            max=self.max,
+            mean=self.total / self.count,
+            percentiles=self.percentiles()
+        )
+
+
+# Builds a summary one entry at a time, so entries can be dropped as soon as they were added
+class SummaryBuilder:
+    def __init__(self, bucket_size: timedelta = timedelta(hours=1), downsample_points: int = DOWNSAMPLE_POINTS):
+        self.step = bucket_size.total_seconds()
+        self.downsample_points = downsample_points
+        self.count = 0
+        self.metrics: dict[str, MetricAccumulator] = {}
+        self.buckets: dict[float, dict[str, MetricAccumulator]] = {}
+
+    def add(self, entry: dict[str, Any]) -> None:
+        timestamp = get_entry_timestamp(entry)
+        if timestamp is None:
+            return
+
+        self.count += 1
+        epoch = timestamp.timestamp()
+        bucket = self.buckets.setdefault(epoch - epoch % self.step, {})
+        for key, value in entry.items():
+            if is_metric(key, value) and isfinite(value):
+                self.metrics.setdefault(key, MetricAccumulator(max_points=0)).add(float(value), epoch)
+                bucket.setdefault(key, MetricAccumulator()).add(float(value), epoch)
+
+    # The trend is downsampled from the raw points the buckets sampled
+    def build(self) -> SeriesSummary:
+        buckets = [
+            BucketStats(
+                start=datetime.fromtimestamp(bucket_start, timezone.utc),
+                metrics={key: bucket[key].stats() for key in self.metrics if key in bucket}
+            )
+            for bucket_start, bucket in sorted(self.buckets.items())
+        ]
+
+        downsampled = {}
+        for key in self.metrics:
+            points = sorted(point for bucket in self.buckets.values() if key in bucket for point in bucket[key].points)
+            downsampled[key] = [
+                (datetime.fromtimestamp(timestamp, timezone.utc), value)
+                for timestamp, value in lttb(points, self.downsample_points)
+            ]
+
+        return SeriesSummary(
+            count=self.count,
+            metrics={key: metric.stats() for key, metric in self.metrics.items()},
+            buckets=buckets,
+            downsampled=downsampled
+        )
+
+
+def summarize_entries(
+    entries: Iterable[dict[str, Any]],
+    bucket_size: timedelta = timedelta(hours=1),
+    downsample_points: int = DOWNSAMPLE_POINTS
+) -> SeriesSummary:
+    builder = SummaryBuilder(bucket_size, downsample_points)
+    for entry in entries:
+        builder.add(entry)
+    return builder.build()
+
+
+async def summarize_stream(
+    entries: AsyncIterator[dict[str, Any]],
+    bucket_size: timedelta = timedelta(hours=1),
+    downsample_points: int = DOWNSAMPLE_POINTS
+) -> SeriesSummary:
+    builder = SummaryBuilder(bucket_size, downsample_points)
+    async for entry in entries:
+        builder.add(entry)
+    return builder.build()
+
+
+# Render a summary as a compact monospace table
+def format_summary(summary: SeriesSummary, bucket_format: str = "%H:%M") -> str:
+    if not summary.count:
+        return "No entries."
+
+    lines = [f"Entries: {summary.count}"]
+    for key, stats in summary.metrics.items():
+        percentiles = " ".join(f"p{percent} {value:.1f}" for percent, value in stats.percentiles.items())
+        lines.append(f"{key}: min {stats.min:.1f} max {stats.max:.1f} mean {stats.mean:.1f} {percentiles}")
+
+    lines.append("")
+    lines.append("Per period (min/mean/max):")
+    for bucket in summary.buckets:
+        metrics = "  ".join(
+            f"{key} {stats.min:.1f}/{stats.mean:.1f}/{stats.max:.1f}" for key, stats in bucket.metrics.items()
+        )
+        lines.append(f"{bucket.start.strftime(bucket_format)}  {metrics}")
+
+    lines.append("")
+    lines.append("Trend:")
+    for key, points in summary.downsampled.items():
+        lines.append(f"{key}: " + " ".join(f"{value:.1f}" for _, value in points))
+
+    return "\n".join(lines)